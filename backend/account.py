@@ -0,0 +1,66 @@
+from datetime import date
+from models import db, User, Booking, Lease, Payment
+from serializers import eager, to_dicts
+from scheduling import ACTIVE_BOOKING_STATUSES
+
+ACCOUNT_SECTIONS = ('profile', 'leases', 'payments', 'bookings')
+
+RECENT_PAYMENTS = 10
+UPCOMING_BOOKINGS = 20
+
+
+class InvalidSections(ValueError):
+    pass
+
+
+def section_args(args):
+    """Read the comma-separated ``sections`` to include, all of them by default."""
+    sections = [name for name in args.get('sections', ','.join(ACCOUNT_SECTIONS)).split(',') if name]
+    if not sections or not set(sections) <= set(ACCOUNT_SECTIONS):
+        raise InvalidSections(f'sections must be a list of: {", ".join(ACCOUNT_SECTIONS)}')
+    return sections
+
+
+def tenant_leases(user_id):
+    """Leases held by ``user_id``."""
+    return Lease.query.filter(Lease.tenant_id == user_id)
+
+
+def tenant_payments(user_id):
+    """Payments on the leases of ``user_id``, joined in the same query."""
+    return Payment.query.join(Lease, Payment.lease_id == Lease.id).filter(Lease.tenant_id == user_id)
+
+
+def account_overview(user_id, args):
+    """Everything the resident portal shows after login, for one user.
+
+    Each section is a single query with its related rows joined in (leases
+    add one more for their balances), so the whole account costs at most
+    five queries however many leases, payments and bookings there are.
+    """
+    sections = section_args(args)
+    account = {}
+
+    if 'profile' in sections:
+        user = db.session.get(User, user_id)
+        account['profile'] = user.to_dict() if user else None
+
+    if 'leases' in sections:
+        leases = eager(tenant_leases(user_id), Lease) \
+            .order_by(Lease.start_date.desc(), Lease.id.desc()).all()
+        account['leases'] = to_dicts(leases, Lease)
+
+    if 'payments' in sections:
+        payments = tenant_payments(user_id) \
+            .order_by(Payment.payment_date.desc(), Payment.id.desc()).limit(RECENT_PAYMENTS)
+        account['payments'] = [payment.to_dict() for payment in payments]
+
+    if 'bookings' in sections:
+        bookings = eager(Booking.query, Booking).filter(
+            Booking.user_id == user_id,
+            Booking.booking_date >= date.today(),
+            Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+        ).order_by(Booking.booking_date, Booking.start_time, Booking.id).limit(UPCOMING_BOOKINGS)
+        account['bookings'] = [booking.to_dict() for booking in bookings]
+
+    return account
@@ -1,49 +1,177 @@
-from flask import Flask, jsonify, request
+import click
+from flask import Blueprint, Flask, jsonify, request
 from flask_cors import CORS
-from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import JWTManager, jwt_required
 from config import Config
 from models import db, User, Tower, Unit, Amenity, Booking, Lease, Payment
-from datetime import datetime, date, time
+from identity import admin_required, current_identity, is_token_revoked, issue_token, revoke_tokens
+from serializers import InvalidFields, eager, serialize_collection, to_dicts
+from pagination import InvalidCursor
+from exports import EXPORT_MODELS, EXPORT_FORMATS, export_response
+from imports import IMPORT_SPECS, InvalidImport, import_upload
+import migrations
+from scheduling import ACTIVE_BOOKING_STATUSES, SlotUnavailable, check_slot
+import availability
+from moderation import MAX_MODERATION_BATCH, MODERATION_STATUSES, moderate_bookings
+from stats import dashboard_snapshot
+from passwords import HashingBusy, password_hasher
+from logging_setup import configure_logging, logger
+from versioning import conditional
+from cache import response_cache
+from encoders import ResponseEncoder
+from compression import response_compressor
+import unit_search
+import text_search
+import reporting
+import arrears
+from account import InvalidSections, account_overview, tenant_leases, tenant_payments
+from datetime import datetime, date, time, timedelta
 import os
 
-app = Flask(__name__)
-app.config.from_object(Config)
+api = Blueprint('api', __name__, cli_group=None)
+jwt = JWTManager()
+# Process start, for the liveness uptime; gunicorn's post_fork resets it per worker.
+started_at = datetime.utcnow()
 
-CORS(app)
-db.init_app(app)
-jwt = JWTManager(app)
 
-
-# Helper function to get user ID as integer from JWT
-def get_current_user_id():
-    return int(get_jwt_identity())
+def create_app(config_object=Config):
+    """Build the Flask application. Serve it with ``gunicorn -c gunicorn.conf.py``."""
+    app = Flask(__name__)
+    app.config.from_object(config_object)
+    app.json = ResponseEncoder(app)
+    
+    configure_logging(app)
+    CORS(app)
+    db.init_app(app)
+    jwt.init_app(app)
+    response_cache.init_app(app)
+    response_compressor.init_app(app)
+    app.register_blueprint(api)
+    
+    return app
 
 
 # JWT error handlers
 @jwt.unauthorized_loader
 def unauthorized_callback(callback):
-    print(f"Unauthorized: {callback}")
+    logger.info('unauthorized request', extra={'fields': {'reason': callback}})
     return jsonify({'error': 'Missing or invalid authorization token'}), 401
 
 @jwt.invalid_token_loader
 def invalid_token_callback(callback):
-    print(f"Invalid token: {callback}")
+    logger.info('invalid token', extra={'fields': {'reason': callback}})
     return jsonify({'error': 'Invalid token'}), 401
 
 @jwt.expired_token_loader
 def expired_token_callback(jwt_header, jwt_payload):
-    print(f"Expired token - Header: {jwt_header}, Payload: {jwt_payload}")
+    logger.info('expired token', extra={'fields': {'user_id': jwt_payload.get('sub')}})
     return jsonify({'error': 'Token has expired'}), 401
 
+@jwt.token_in_blocklist_loader
+def token_revoked_check(jwt_header, jwt_payload):
+    return is_token_revoked(jwt_payload)
+
+@jwt.revoked_token_loader
+def revoked_token_callback(jwt_header, jwt_payload):
+    return jsonify({'error': 'Token has been revoked'}), 401
+
+
+@api.app_errorhandler(InvalidCursor)
+def invalid_cursor_handler(error):
+    return jsonify({'error': str(error)}), 400
+
+
+@api.app_errorhandler(unit_search.InvalidSearch)
+def invalid_search_handler(error):
+    return jsonify({'error': str(error)}), 400
+
+
+@api.app_errorhandler(InvalidImport)
+def invalid_import_handler(error):
+    return jsonify({'error': str(error)}), 400
+
+
+@api.app_errorhandler(reporting.InvalidReport)
+def invalid_report_handler(error):
+    return jsonify({'error': str(error)}), 400
+
+
+@api.app_errorhandler(InvalidFields)
+def invalid_fields_handler(error):
+    return jsonify({'error': str(error)}), 400
+
+
+@api.app_errorhandler(InvalidSections)
+def invalid_sections_handler(error):
+    return jsonify({'error': str(error)}), 400
+
+
+@api.app_errorhandler(HashingBusy)
+def hashing_busy_handler(error):
+    return jsonify({'error': 'Server is busy, please retry shortly'}), 503, {'Retry-After': '1'}
+
+
+@api.app_errorhandler(SlotUnavailable)
+def slot_unavailable_handler(error):
+    db.session.rollback()
+    return jsonify({'error': str(error)}), error.status_code
+
+
+# ============= Database Bootstrap =============
 
-# Initialize database and seed data
-@app.before_request
-def initialize_database():
-    if not hasattr(app, 'db_initialized'):
-        with app.app_context():
-            db.create_all()
-            seed_data()
-            app.db_initialized = True
+def bootstrap_database():
+    """Apply migrations and seed an empty database, one process at a time."""
+    with migrations.bootstrap_lock():
+        migrations.upgrade()
+        seed_data()
+
+
+@api.cli.command('bootstrap')
+def bootstrap_command():
+    """Migrate and seed the database. Run once before starting the server."""
+    bootstrap_database()
+    print("Database is ready")
+
+
+@api.cli.command('db-upgrade')
+def db_upgrade_command():
+    """Apply pending schema migrations."""
+    with migrations.bootstrap_lock():
+        applied = migrations.upgrade()
+    print(f"Applied migrations: {applied}" if applied else "Database schema is up to date")
+
+
+@api.cli.command('db-explain')
+def db_explain_command():
+    """EXPLAIN the query behind each hot route and flag table scans."""
+    missing = 0
+    for name, plan, uses_index in migrations.explain_hot_queries():
+        print(f"[{'ok' if uses_index else 'SCAN'}] {name}")
+        for line in plan:
+            print(f"    {line}")
+        missing += not uses_index
+    if missing:
+        raise SystemExit(f"{missing} queries are not served by an index")
+
+
+@api.cli.command('reports-rebuild')
+def reports_rebuild_command():
+    """Recompute the revenue rollups from the payments table."""
+    with db.engine.begin() as conn:
+        rows = reporting.rebuild_rollups(conn)
+    print(f"Rebuilt {rows} revenue rollup rows")
+
+
+@api.cli.command('revoke-tokens')
+@click.argument('email')
+def revoke_tokens_command(email):
+    """Sign a user out everywhere by invalidating every token issued so far."""
+    user = User.query.filter_by(email=email).first()
+    if not user:
+        raise SystemExit(f"No user with email {email}")
+    revoke_tokens(user)
+    db.session.commit()
+    print(f"Revoked all tokens of {email}")
 
 
 def seed_data():
@@ -176,14 +304,16 @@ def seed_data():
                    status='pending', notes='Evening workout'),
         ]
         db.session.add_all(bookings)
+        for booking in bookings:
+            availability.record_booking_change(None, availability.active_slot(booking))
         
         db.session.commit()
-        print("Database seeded successfully!")
+        logger.info('database seeded')
 
 
 # ============= Authentication Routes =============
 
-@app.route('/api/auth/register', methods=['POST'])
+@api.route('/api/auth/register', methods=['POST'])
 def register():
     data = request.get_json()
     
@@ -196,7 +326,7 @@ def register():
         phone=data.get('phone'),
         role='resident'
     )
-    user.set_password(data.get('password'))
+    user.password_hash = password_hasher.hash(data.get('password'))
     
     db.session.add(user)
     db.session.commit()
@@ -204,65 +334,72 @@ def register():
     return jsonify({'message': 'User registered successfully', 'user': user.to_dict()}), 201
 
 
-@app.route('/api/auth/login', methods=['POST'])
+@api.route('/api/auth/login', methods=['POST'])
 def login():
     data = request.get_json()
     user = User.query.filter_by(email=data.get('email')).first()
     
-    if not user or not user.check_password(data.get('password')):
+    if not user or not password_hasher.verify(user.password_hash, data.get('password')):
         return jsonify({'error': 'Invalid email or password'}), 401
     
-    access_token = create_access_token(identity=str(user.id))
-    print(f"Login successful - User ID: {user.id}, Email: {user.email}, Role: {user.role}")
-    print(f"Generated token: {access_token[:50]}...")
+    # Upgrade hashes made with older parameters while we have the plain password
+    if password_hasher.needs_rehash(user.password_hash):
+        user.password_hash = password_hasher.hash(data.get('password'))
+        db.session.commit()
+    
+    access_token = issue_token(user)
+    logger.info('login succeeded', extra={'fields': {'user_id': user.id, 'role': user.role}})
     return jsonify({
         'access_token': access_token,
         'user': user.to_dict()
     }), 200
 
 
-@app.route('/api/auth/me', methods=['GET'])
+@api.route('/api/auth/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
     try:
-        user_id = get_current_user_id()
-        print(f"Auth/me - User ID from JWT: {user_id}")
+        user_id = current_identity().id
         user = User.query.get(user_id)
         
         if not user:
-            print(f"Auth/me - User not found for ID: {user_id}")
+            logger.warning('token for missing user', extra={'fields': {'user_id': user_id}})
             return jsonify({'error': 'User not found'}), 404
         
-        print(f"Auth/me - User found: {user.email}")
         return jsonify(user.to_dict()), 200
     except Exception as e:
-        print(f"Auth/me - Error: {str(e)}")
+        logger.exception('auth/me failed')
         return jsonify({'error': str(e)}), 500
 
 
+@api.route('/api/me/account', methods=['GET'])
+@jwt_required()
+def get_account():
+    return jsonify(account_overview(current_identity().id, request.args)), 200
+
+
 # ============= Tower Routes =============
 
-@app.route('/api/towers', methods=['GET'])
+@api.route('/api/towers', methods=['GET'])
+@conditional('towers', 'units')
+@response_cache.cached('towers', 'units')
 def get_towers():
     towers = Tower.query.all()
-    return jsonify([tower.to_dict() for tower in towers]), 200
+    unit_counts = Tower.unit_counts()
+    return jsonify([tower.to_dict(unit_counts.get(tower.id, {})) for tower in towers]), 200
 
 
-@app.route('/api/towers/<int:tower_id>', methods=['GET'])
+@api.route('/api/towers/<int:tower_id>', methods=['GET'])
+@conditional('towers', 'units')
+@response_cache.cached('towers', 'units')
 def get_tower(tower_id):
     tower = Tower.query.get_or_404(tower_id)
     return jsonify(tower.to_dict()), 200
 
 
-@app.route('/api/towers', methods=['POST'])
-@jwt_required()
+@api.route('/api/towers', methods=['POST'])
+@admin_required
 def create_tower():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
-    
     data = request.get_json()
     tower = Tower(
         name=data.get('name'),
@@ -276,15 +413,9 @@ def create_tower():
     return jsonify(tower.to_dict()), 201
 
 
-@app.route('/api/towers/<int:tower_id>', methods=['PUT'])
-@jwt_required()
+@api.route('/api/towers/<int:tower_id>', methods=['PUT'])
+@admin_required
 def update_tower(tower_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
-    
     tower = Tower.query.get_or_404(tower_id)
     data = request.get_json()
     
@@ -296,15 +427,9 @@ def update_tower(tower_id):
     return jsonify(tower.to_dict()), 200
 
 
-@app.route('/api/towers/<int:tower_id>', methods=['DELETE'])
-@jwt_required()
+@api.route('/api/towers/<int:tower_id>', methods=['DELETE'])
+@admin_required
 def delete_tower(tower_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
-    
     tower = Tower.query.get_or_404(tower_id)
     db.session.delete(tower)
     db.session.commit()
@@ -312,9 +437,20 @@ def delete_tower(tower_id):
     return jsonify({'message': 'Tower deleted successfully'}), 200
 
 
+# ============= Search Routes =============
+
+@api.route('/api/search', methods=['GET'])
+@conditional('units', 'towers', 'amenities')
+@response_cache.cached('units', 'towers', 'amenities')
+def search():
+    return jsonify(text_search.search(request.args)), 200
+
+
 # ============= Unit Routes =============
 
-@app.route('/api/units', methods=['GET'])
+@api.route('/api/units', methods=['GET'])
+@conditional('units', 'towers')
+@response_cache.cached('units', 'towers')
 def get_units():
     status = request.args.get('status')
     tower_id = request.args.get('tower_id')
@@ -326,25 +462,27 @@ def get_units():
     if tower_id:
         query = query.filter_by(tower_id=tower_id)
     
-    units = query.all()
-    return jsonify([unit.to_dict() for unit in units]), 200
+    return jsonify(serialize_collection(query, Unit)), 200
 
 
-@app.route('/api/units/<int:unit_id>', methods=['GET'])
+@api.route('/api/units/search', methods=['GET'])
+@conditional('units', 'towers')
+@response_cache.cached('units', 'towers')
+def search_units():
+    return jsonify(unit_search.search(request.args)), 200
+
+
+@api.route('/api/units/<int:unit_id>', methods=['GET'])
+@conditional('units', 'towers')
+@response_cache.cached('units', 'towers')
 def get_unit(unit_id):
-    unit = Unit.query.get_or_404(unit_id)
+    unit = eager(Unit.query, Unit).get_or_404(unit_id)
     return jsonify(unit.to_dict()), 200
 
 
-@app.route('/api/units', methods=['POST'])
-@jwt_required()
+@api.route('/api/units', methods=['POST'])
+@admin_required
 def create_unit():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
-    
     data = request.get_json()
     unit = Unit(
         tower_id=data.get('tower_id'),
@@ -365,15 +503,9 @@ def create_unit():
     return jsonify(unit.to_dict()), 201
 
 
-@app.route('/api/units/<int:unit_id>', methods=['PUT'])
-@jwt_required()
+@api.route('/api/units/<int:unit_id>', methods=['PUT'])
+@admin_required
 def update_unit(unit_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
-    
     unit = Unit.query.get_or_404(unit_id)
     data = request.get_json()
     
@@ -392,15 +524,9 @@ def update_unit(unit_id):
     return jsonify(unit.to_dict()), 200
 
 
-@app.route('/api/units/<int:unit_id>', methods=['DELETE'])
-@jwt_required()
+@api.route('/api/units/<int:unit_id>', methods=['DELETE'])
+@admin_required
 def delete_unit(unit_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
-    
     unit = Unit.query.get_or_404(unit_id)
     db.session.delete(unit)
     db.session.commit()
@@ -410,27 +536,43 @@ def delete_unit(unit_id):
 
 # ============= Amenity Routes =============
 
-@app.route('/api/amenities', methods=['GET'])
+@api.route('/api/amenities', methods=['GET'])
+@conditional('amenities')
+@response_cache.cached('amenities')
 def get_amenities():
     amenities = Amenity.query.all()
     return jsonify([amenity.to_dict() for amenity in amenities]), 200
 
 
-@app.route('/api/amenities/<int:amenity_id>', methods=['GET'])
+@api.route('/api/amenities/<int:amenity_id>', methods=['GET'])
+@conditional('amenities')
+@response_cache.cached('amenities')
 def get_amenity(amenity_id):
     amenity = Amenity.query.get_or_404(amenity_id)
     return jsonify(amenity.to_dict()), 200
 
 
-@app.route('/api/amenities', methods=['POST'])
-@jwt_required()
-def create_amenity():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+@api.route('/api/amenities/<int:amenity_id>/availability', methods=['GET'])
+def get_amenity_availability(amenity_id):
+    amenity = Amenity.query.get_or_404(amenity_id)
     
-    if user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
+    try:
+        start_day = datetime.strptime(request.args['from'], '%Y-%m-%d').date() if request.args.get('from') else date.today()
+        end_day = datetime.strptime(request.args['to'], '%Y-%m-%d').date() if request.args.get('to') else start_day + timedelta(days=30)
+    except ValueError:
+        return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+    
+    if end_day < start_day:
+        return jsonify({'error': "'to' must not be before 'from'"}), 400
+    if (end_day - start_day).days >= availability.MAX_RANGE_DAYS:
+        return jsonify({'error': f'Range is limited to {availability.MAX_RANGE_DAYS} days'}), 400
     
+    return jsonify(availability.availability(amenity, start_day, end_day)), 200
+
+
+@api.route('/api/amenities', methods=['POST'])
+@admin_required
+def create_amenity():
     data = request.get_json()
     amenity = Amenity(
         name=data.get('name'),
@@ -447,15 +589,9 @@ def create_amenity():
     return jsonify(amenity.to_dict()), 201
 
 
-@app.route('/api/amenities/<int:amenity_id>', methods=['PUT'])
-@jwt_required()
+@api.route('/api/amenities/<int:amenity_id>', methods=['PUT'])
+@admin_required
 def update_amenity(amenity_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
-    
     amenity = Amenity.query.get_or_404(amenity_id)
     data = request.get_json()
     
@@ -470,15 +606,9 @@ def update_amenity(amenity_id):
     return jsonify(amenity.to_dict()), 200
 
 
-@app.route('/api/amenities/<int:amenity_id>', methods=['DELETE'])
-@jwt_required()
+@api.route('/api/amenities/<int:amenity_id>', methods=['DELETE'])
+@admin_required
 def delete_amenity(amenity_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
-    
     amenity = Amenity.query.get_or_404(amenity_id)
     db.session.delete(amenity)
     db.session.commit()
@@ -488,53 +618,45 @@ def delete_amenity(amenity_id):
 
 # ============= Booking Routes =============
 
-@app.route('/api/bookings', methods=['GET'])
+@api.route('/api/bookings', methods=['GET'])
 @jwt_required()
 def get_bookings():
     try:
-        print(f"Bookings request - Authorization header: {request.headers.get('Authorization', 'NOT FOUND')}")
-        user_id = get_current_user_id()
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
+        identity = current_identity()
         
-        if user.role == 'admin':
-            bookings = Booking.query.order_by(Booking.created_at.desc()).all()
+        if identity.is_admin:
+            query = Booking.query
         else:
-            bookings = Booking.query.filter_by(user_id=user_id).order_by(Booking.created_at.desc()).all()
+            query = Booking.query.filter_by(user_id=identity.id)
         
-        return jsonify([booking.to_dict() for booking in bookings]), 200
+        query = query.order_by(Booking.created_at.desc())
+        return jsonify(serialize_collection(query, Booking)), 200
+    except (InvalidCursor, InvalidFields):
+        raise
     except Exception as e:
-        print(f"Bookings error: {str(e)}")
+        logger.exception('listing bookings failed')
         return jsonify({'error': str(e)}), 500
 
 
-@app.route('/api/bookings/<int:booking_id>', methods=['GET'])
+@api.route('/api/bookings/<int:booking_id>', methods=['GET'])
 @jwt_required()
 def get_booking(booking_id):
-    user_id = get_current_user_id()
-    user = User.query.get(user_id)
+    identity = current_identity()
+    booking = eager(Booking.query, Booking).get_or_404(booking_id)
     
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
-    booking = Booking.query.get_or_404(booking_id)
-    
-    if user.role != 'admin' and booking.user_id != user_id:
+    if not identity.is_admin and booking.user_id != identity.id:
         return jsonify({'error': 'Unauthorized'}), 403
     
     return jsonify(booking.to_dict()), 200
 
 
-@app.route('/api/bookings', methods=['POST'])
+@api.route('/api/bookings', methods=['POST'])
 @jwt_required()
 def create_booking():
-    user_id = get_current_user_id()
     data = request.get_json()
     
     booking = Booking(
-        user_id=user_id,
+        user_id=current_identity().id,
         amenity_id=data.get('amenity_id'),
         booking_date=datetime.strptime(data.get('booking_date'), '%Y-%m-%d').date(),
         start_time=datetime.strptime(data.get('start_time'), '%H:%M').time(),
@@ -543,26 +665,30 @@ def create_booking():
         notes=data.get('notes')
     )
     
+    check_slot(booking.amenity_id, booking.booking_date, booking.start_time, booking.end_time)
+    availability.record_booking_change(None, availability.active_slot(booking))
+    
     db.session.add(booking)
     db.session.commit()
     
     return jsonify(booking.to_dict()), 201
 
 
-@app.route('/api/bookings/<int:booking_id>', methods=['PUT'])
+@api.route('/api/bookings/<int:booking_id>', methods=['PUT'])
 @jwt_required()
 def update_booking(booking_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
+    identity = current_identity()
     booking = Booking.query.get_or_404(booking_id)
     data = request.get_json()
+    was_active = booking.status in ACTIVE_BOOKING_STATUSES
+    previous_slot = (booking.booking_date, booking.start_time, booking.end_time)
+    held_slot = availability.active_slot(booking)
     
     # Only admin can approve/decline, users can update their own bookings
-    if user.role == 'admin':
+    if identity.is_admin:
         booking.status = data.get('status', booking.status)
         booking.admin_notes = data.get('admin_notes', booking.admin_notes)
-    elif booking.user_id == user_id:
+    elif booking.user_id == identity.id:
         booking.notes = data.get('notes', booking.notes)
         if booking.status == 'pending':
             booking.booking_date = datetime.strptime(data.get('booking_date'), '%Y-%m-%d').date() if data.get('booking_date') else booking.booking_date
@@ -571,21 +697,48 @@ def update_booking(booking_id):
     else:
         return jsonify({'error': 'Unauthorized'}), 403
     
+    # Re-check capacity when the booking claims a slot it did not hold before
+    slot = (booking.booking_date, booking.start_time, booking.end_time)
+    if booking.status in ACTIVE_BOOKING_STATUSES and (not was_active or slot != previous_slot):
+        check_slot(booking.amenity_id, *slot, exclude_booking_id=booking.id)
+    availability.record_booking_change(held_slot, availability.active_slot(booking))
+    
     db.session.commit()
     return jsonify(booking.to_dict()), 200
 
 
-@app.route('/api/bookings/<int:booking_id>', methods=['DELETE'])
+@api.route('/api/bookings/batch', methods=['PUT'])
+@admin_required
+def moderate_booking_batch():
+    data = request.get_json()
+    ids = data.get('ids')
+    status = data.get('status')
+    
+    if status not in MODERATION_STATUSES:
+        return jsonify({'error': f'status must be one of: {", ".join(MODERATION_STATUSES)}'}), 400
+    if not isinstance(ids, list) or not ids or not all(type(ident) is int for ident in ids):
+        return jsonify({'error': 'ids must be a non-empty list of booking IDs'}), 400
+    if len(ids) > MAX_MODERATION_BATCH:
+        return jsonify({'error': f'At most {MAX_MODERATION_BATCH} bookings per batch'}), 400
+    
+    results = moderate_bookings(set(ids), status, data.get('admin_notes'))
+    db.session.commit()
+    
+    updated = sum(1 for result in results.values() if result['ok'])
+    logger.info('bookings moderated', extra={'fields': {'status': status, 'requested': len(results), 'updated': updated}})
+    return jsonify({'status': status, 'updated': updated, 'results': results}), 200
+
+
+@api.route('/api/bookings/<int:booking_id>', methods=['DELETE'])
 @jwt_required()
 def delete_booking(booking_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
+    identity = current_identity()
     booking = Booking.query.get_or_404(booking_id)
     
-    if user.role != 'admin' and booking.user_id != user_id:
+    if not identity.is_admin and booking.user_id != identity.id:
         return jsonify({'error': 'Unauthorized'}), 403
     
+    availability.record_booking_change(availability.active_slot(booking), None)
     db.session.delete(booking)
     db.session.commit()
     
@@ -594,43 +747,34 @@ def delete_booking(booking_id):
 
 # ============= Lease Routes =============
 
-@app.route('/api/leases', methods=['GET'])
+@api.route('/api/leases', methods=['GET'])
 @jwt_required()
 def get_leases():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    identity = current_identity()
     
-    if user.role == 'admin':
-        leases = Lease.query.all()
+    if identity.is_admin:
+        query = Lease.query
     else:
-        leases = Lease.query.filter_by(tenant_id=user_id).all()
+        query = tenant_leases(identity.id)
     
-    return jsonify([lease.to_dict() for lease in leases]), 200
+    return jsonify(serialize_collection(query, Lease)), 200
 
 
-@app.route('/api/leases/<int:lease_id>', methods=['GET'])
+@api.route('/api/leases/<int:lease_id>', methods=['GET'])
 @jwt_required()
 def get_lease(lease_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    lease = Lease.query.get_or_404(lease_id)
+    identity = current_identity()
+    lease = eager(Lease.query, Lease).get_or_404(lease_id)
     
-    if user.role != 'admin' and lease.tenant_id != user_id:
+    if not identity.is_admin and lease.tenant_id != identity.id:
         return jsonify({'error': 'Unauthorized'}), 403
     
-    return jsonify(lease.to_dict()), 200
+    return jsonify(to_dicts([lease], Lease)[0]), 200
 
 
-@app.route('/api/leases', methods=['POST'])
-@jwt_required()
+@api.route('/api/leases', methods=['POST'])
+@admin_required
 def create_lease():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
-    
     data = request.get_json()
     lease = Lease(
         unit_id=data.get('unit_id'),
@@ -650,18 +794,12 @@ def create_lease():
     db.session.add(lease)
     db.session.commit()
     
-    return jsonify(lease.to_dict()), 201
+    return jsonify(to_dicts([lease], Lease)[0]), 201
 
 
-@app.route('/api/leases/<int:lease_id>', methods=['PUT'])
-@jwt_required()
+@api.route('/api/leases/<int:lease_id>', methods=['PUT'])
+@admin_required
 def update_lease(lease_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
-    
     lease = Lease.query.get_or_404(lease_id)
     data = request.get_json()
     
@@ -670,20 +808,16 @@ def update_lease(lease_id):
     lease.rent_amount = data.get('rent_amount', lease.rent_amount)
     lease.security_deposit = data.get('security_deposit', lease.security_deposit)
     lease.status = data.get('status', lease.status)
+    if data.get('terminated_on') and lease.status == 'terminated':
+        lease.terminated_on = datetime.strptime(data.get('terminated_on'), '%Y-%m-%d').date()
     
     db.session.commit()
-    return jsonify(lease.to_dict()), 200
+    return jsonify(to_dicts([lease], Lease)[0]), 200
 
 
-@app.route('/api/leases/<int:lease_id>', methods=['DELETE'])
-@jwt_required()
+@api.route('/api/leases/<int:lease_id>', methods=['DELETE'])
+@admin_required
 def delete_lease(lease_id):
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
-    
     lease = Lease.query.get_or_404(lease_id)
     
     # Update unit status
@@ -699,39 +833,29 @@ def delete_lease(lease_id):
 
 # ============= Payment Routes =============
 
-@app.route('/api/payments', methods=['GET'])
+@api.route('/api/payments', methods=['GET'])
 @jwt_required()
 def get_payments():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
+    identity = current_identity()
     
-    if user.role == 'admin':
-        payments = Payment.query.all()
+    if identity.is_admin:
+        query = Payment.query
     else:
-        # Get payments for user's leases
-        user_leases = Lease.query.filter_by(tenant_id=user_id).all()
-        lease_ids = [lease.id for lease in user_leases]
-        payments = Payment.query.filter(Payment.lease_id.in_(lease_ids)).all()
+        query = tenant_payments(identity.id)
     
-    return jsonify([payment.to_dict() for payment in payments]), 200
+    return jsonify(serialize_collection(query, Payment)), 200
 
 
-@app.route('/api/payments/<int:payment_id>', methods=['GET'])
+@api.route('/api/payments/<int:payment_id>', methods=['GET'])
 @jwt_required()
 def get_payment(payment_id):
     payment = Payment.query.get_or_404(payment_id)
     return jsonify(payment.to_dict()), 200
 
 
-@app.route('/api/payments', methods=['POST'])
-@jwt_required()
+@api.route('/api/payments', methods=['POST'])
+@admin_required
 def create_payment():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
-    
     data = request.get_json()
     payment = Payment(
         lease_id=data.get('lease_id'),
@@ -749,71 +873,109 @@ def create_payment():
     return jsonify(payment.to_dict()), 201
 
 
-# ============= Dashboard/Stats Routes =============
+# ============= Report Routes =============
 
-@app.route('/api/stats/dashboard', methods=['GET'])
-@jwt_required()
-def get_dashboard_stats():
-    try:
-        user_id = get_current_user_id()
-        print(f"Dashboard request - User ID from JWT: {user_id}")
-        user = User.query.get(user_id)
-        
-        if not user:
-            print(f"User not found for ID: {user_id}")
-            return jsonify({'error': 'User not found'}), 404
-        
-        print(f"User found: {user.email}, Role: {user.role}")
-        
-        if user.role != 'admin':
-            return jsonify({'error': 'Unauthorized'}), 403
-    except Exception as e:
-        print(f"Error in dashboard stats: {str(e)}")
-        return jsonify({'error': str(e)}), 500
-    
-    total_units = Unit.query.count()
-    occupied_units = Unit.query.filter_by(status='occupied').count()
-    available_units = Unit.query.filter_by(status='available').count()
-    total_tenants = Lease.query.filter_by(status='active').count()
-    pending_bookings = Booking.query.filter_by(status='pending').count()
-    total_revenue = db.session.query(db.func.sum(Payment.amount)).filter_by(status='completed').scalar() or 0
+@api.route('/api/reports/revenue', methods=['GET'])
+@admin_required
+def get_revenue_report():
+    return jsonify(reporting.revenue_report(request.args)), 200
+
+
+@api.route('/api/reports/arrears', methods=['GET'])
+@admin_required
+def get_arrears_report():
+    return jsonify(arrears.arrears_report(request.args)), 200
+
+
+# ============= Export Routes =============
+
+@api.route('/api/export/<resource>', methods=['GET'])
+@admin_required
+def export_data(resource):
+    fmt = request.args.get('format', 'ndjson')
+    if resource not in EXPORT_MODELS:
+        return jsonify({'error': f'Unknown export: {resource}'}), 404
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f'Unsupported format: {fmt}'}), 400
     
-    stats = {
-        'total_units': total_units,
-        'occupied_units': occupied_units,
-        'available_units': available_units,
-        'occupancy_rate': round((occupied_units / total_units * 100) if total_units > 0 else 0, 2),
-        'total_tenants': total_tenants,
-        'pending_bookings': pending_bookings,
-        'total_revenue': total_revenue
-    }
+    return export_response(resource, fmt)
+
+
+# ============= Import Routes =============
+
+@api.route('/api/import/<resource>', methods=['POST'])
+@admin_required
+def import_data(resource):
+    if resource not in IMPORT_SPECS:
+        return jsonify({'error': f'Unknown import: {resource}'}), 404
     
-    return jsonify(stats), 200
+    report = import_upload(request, resource)
+    status = 422 if report.mode == 'atomic' and report.failed else 200
+    return jsonify(report.to_dict()), status
 
 
-@app.route('/api/users', methods=['GET'])
-@jwt_required()
+# ============= Dashboard/Stats Routes =============
+
+@api.route('/api/stats/dashboard', methods=['GET'])
+@admin_required
+def get_dashboard_stats():
+    return jsonify(dashboard_snapshot.get()), 200
+
+
+@api.route('/api/users', methods=['GET'])
+@admin_required
 def get_users():
-    user_id = get_jwt_identity()
-    user = User.query.get(user_id)
-    
-    if not user:
-        return jsonify({'error': 'User not found'}), 404
-    
-    if user.role != 'admin':
-        return jsonify({'error': 'Unauthorized'}), 403
-    
-    users = User.query.filter_by(role='resident').all()
-    return jsonify([user.to_dict() for user in users]), 200
+    query = User.query.filter_by(role='resident')
+    return jsonify(serialize_collection(query, User)), 200
+
+
+@api.route('/api/users/<int:user_id>/revoke-sessions', methods=['POST'])
+@admin_required
+def revoke_user_sessions(user_id):
+    user = User.query.get_or_404(user_id)
+    revoke_tokens(user)
+    db.session.commit()
+    logger.info('sessions revoked', extra={'fields': {'user_id': user_id, 'by': current_identity().id}})
+    return jsonify({'message': 'Sessions revoked successfully'}), 200
+
+
+@api.route('/api/cache/stats', methods=['GET'])
+@admin_required
+def get_cache_stats():
+    return jsonify(response_cache.stats()), 200
 
 
 # Health check
-@app.route('/api/health', methods=['GET'])
+@api.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({'status': 'healthy', 'message': 'Rental Portal API is running'}), 200
 
 
+@api.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    return jsonify({
+        'status': 'alive',
+        'pid': os.getpid(),
+        'uptime_seconds': int((datetime.utcnow() - started_at).total_seconds())
+    }), 200
+
+
+@api.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    try:
+        pending = migrations.pending_versions()
+    except Exception as e:
+        return jsonify({'status': 'unavailable', 'error': str(e)}), 503
+    
+    if pending:
+        return jsonify({'status': 'unavailable', 'pending_migrations': pending}), 503
+    return jsonify({'status': 'ready'}), 200
+
+
 if __name__ == "__main__":
+    app = create_app()
+    with app.app_context():
+        bootstrap_database()
     app.run(
         host="0.0.0.0",
         port=int(os.environ.get("PORT", 5000))
@@ -0,0 +1,152 @@
+import sys
+from array import array
+from collections import defaultdict
+from datetime import timedelta
+from models import db, AmenityDay, Booking
+from scheduling import ACTIVE_BOOKING_STATUSES, to_minutes
+
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+MAX_RANGE_DAYS = 92
+
+
+def decode_occupancy(data):
+    """Unpack an ``AmenityDay.occupancy`` blob: one little-endian uint16 per slot."""
+    counts = array('H')
+    if data:
+        counts.frombytes(data)
+        if sys.byteorder == 'big':
+            counts.byteswap()
+    if len(counts) < SLOTS_PER_DAY:
+        counts.extend([0] * (SLOTS_PER_DAY - len(counts)))
+    return counts
+
+
+def encode_occupancy(counts):
+    counts = array('H', counts)
+    if sys.byteorder == 'big':
+        counts.byteswap()
+    return counts.tobytes()
+
+
+def slot_range(start_time, end_time):
+    """Slots touched by ``[start_time, end_time)``, including partial ones."""
+    first = to_minutes(start_time) // SLOT_MINUTES
+    last = -(-to_minutes(end_time) // SLOT_MINUTES)
+    return range(first, min(last, SLOTS_PER_DAY))
+
+
+def active_slot(booking):
+    """The slot a booking holds, or ``None`` if its status frees it."""
+    if booking.status not in ACTIVE_BOOKING_STATUSES:
+        return None
+    return booking.amenity_id, booking.booking_date, booking.start_time, booking.end_time
+
+
+def adjust_occupancy(amenity_id, day, start_time, end_time, delta):
+    row = db.session.get(AmenityDay, (amenity_id, day), with_for_update=True)
+    if row is None:
+        if delta < 0:
+            return
+        row = AmenityDay(amenity_id=amenity_id, day=day)
+        db.session.add(row)
+
+    counts = decode_occupancy(row.occupancy)
+    for slot in slot_range(start_time, end_time):
+        counts[slot] = max(0, counts[slot] + delta)
+    row.occupancy = encode_occupancy(counts)
+
+
+def record_booking_change(before, after):
+    """Move a booking's occupancy from slot ``before`` to slot ``after``.
+
+    Either may be ``None`` (see ``active_slot``). Call in the same transaction
+    as the booking change; creating a day row relies on the amenity lock taken
+    by ``scheduling.check_slot``.
+    """
+    if before == after:
+        return
+    if before is not None:
+        adjust_occupancy(*before, delta=-1)
+    if after is not None:
+        adjust_occupancy(*after, delta=1)
+
+
+def release_slots(slots):
+    """Free many held slots at once, locking and rewriting each day row once.
+
+    ``slots`` are ``active_slot`` tuples of bookings that just stopped
+    holding them.
+    """
+    by_day = defaultdict(list)
+    for amenity_id, day, start_time, end_time in slots:
+        by_day[(amenity_id, day)].append((start_time, end_time))
+    if not by_day:
+        return
+
+    rows = AmenityDay.query.filter(
+        db.tuple_(AmenityDay.amenity_id, AmenityDay.day).in_(list(by_day))
+    ).with_for_update()
+    for row in rows:
+        counts = decode_occupancy(row.occupancy)
+        for start_time, end_time in by_day[(row.amenity_id, row.day)]:
+            for slot in slot_range(start_time, end_time):
+                counts[slot] = max(0, counts[slot] - 1)
+        row.occupancy = encode_occupancy(counts)
+
+
+def availability(amenity, start_day, end_day):
+    """Per-day slot occupancy of ``amenity`` from ``start_day`` to ``end_day`` inclusive."""
+    rows = AmenityDay.query.filter(
+        AmenityDay.amenity_id == amenity.id,
+        AmenityDay.day >= start_day,
+        AmenityDay.day <= end_day
+    )
+    occupancy = {row.day: decode_occupancy(row.occupancy) for row in rows}
+    empty = [0] * SLOTS_PER_DAY
+
+    days = []
+    day = start_day
+    while day <= end_day:
+        booked = list(occupancy.get(day, empty))
+        if amenity.capacity is None:
+            remaining = [None] * SLOTS_PER_DAY
+        else:
+            remaining = [max(0, amenity.capacity - count) for count in booked]
+        days.append({
+            'date': day.isoformat(),
+            'booked': booked,
+            'remaining': remaining,
+            'fully_booked': amenity.capacity is not None and not any(remaining)
+        })
+        day += timedelta(days=1)
+
+    return {
+        'amenity_id': amenity.id,
+        'capacity': amenity.capacity,
+        'available': amenity.available,
+        'slot_minutes': SLOT_MINUTES,
+        'slot_starts': [f'{slot * SLOT_MINUTES // 60:02d}:{slot * SLOT_MINUTES % 60:02d}'
+                        for slot in range(SLOTS_PER_DAY)],
+        'days': days
+    }
+
+
+def backfill_occupancy(conn):
+    """Rebuild every ``amenity_days`` row from the active bookings."""
+    bookings = conn.execute(
+        db.select(Booking.amenity_id, Booking.booking_date, Booking.start_time, Booking.end_time)
+        .where(Booking.status.in_(ACTIVE_BOOKING_STATUSES))
+    )
+    days = {}
+    for amenity_id, day, start_time, end_time in bookings:
+        counts = days.setdefault((amenity_id, day), [0] * SLOTS_PER_DAY)
+        for slot in slot_range(start_time, end_time):
+            counts[slot] += 1
+
+    conn.execute(AmenityDay.__table__.delete())
+    if days:
+        conn.execute(AmenityDay.__table__.insert(), [
+            {'amenity_id': amenity_id, 'day': day, 'occupancy': encode_occupancy(counts)}
+            for (amenity_id, day), counts in days.items()
+        ])
@@ -0,0 +1,71 @@
+"""Arrears engine benchmark.
+
+Fills a throwaway SQLite database with synthetic leases and monthly
+payments, then times a full-portfolio arrears pass with NumPy and with the
+pure-Python fallback:
+
+    python benchmarks/arrears.py --leases 100000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--leases', type=int, default=100000)
+    parser.add_argument('--payments-per-lease', type=int, default=6)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    database = os.path.join(tempfile.mkdtemp(), 'arrears.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{database}'
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    import arrears
+    import migrations
+    from app import create_app
+    from models import db, User, Tower, Unit, Lease, Payment
+
+    app = create_app()
+    with app.app_context():
+        migrations.upgrade()
+        db.session.execute(db.insert(User), [{'email': 'bench@example.com', 'password_hash': '-', 'full_name': 'Bench'}])
+        db.session.execute(db.insert(Tower), [{'name': 'Bench', 'address': '-', 'total_floors': 1}])
+        db.session.execute(db.insert(Unit), [{'tower_id': 1, 'unit_number': 'B-1', 'floor': 1, 'bedrooms': 1,
+                                              'bathrooms': 1, 'area_sqft': 500, 'rent_amount': 1000}])
+        leases, payments = [], []
+        for lease_id in range(1, args.leases + 1):
+            start = date(2024, 1, 1) + timedelta(days=random.randrange(365))
+            leases.append({'unit_id': 1, 'tenant_id': 1, 'start_date': start, 'end_date': start + timedelta(days=365),
+                           'rent_amount': 1000, 'security_deposit': 1000, 'status': 'active'})
+            for month in range(random.randrange(args.payments_per_lease + 1)):
+                payments.append({'lease_id': lease_id, 'amount': 1000, 'status': 'completed',
+                                 'payment_date': start + timedelta(days=30 * month)})
+        db.session.execute(db.insert(Lease), leases)
+        db.session.execute(db.insert(Payment), payments)
+        db.session.commit()
+        print(f'leases:           {args.leases}, payments: {len(payments)}')
+
+        numpy = arrears.np
+        for label, module in (('numpy', numpy), ('pure python', None)):
+            if label == 'numpy' and numpy is None:
+                continue
+            arrears.np = module
+            timings = []
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                summary = arrears.Arrears().summary()
+                timings.append(time.perf_counter() - started)
+            print(f'{label + ":":<18}{min(timings) * 1000:.1f} ms best of {args.runs}, {summary}')
+        arrears.np = numpy
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Login storm benchmark.
+
+Fires concurrent logins at a running server while a probe thread keeps
+requesting a cheap endpoint, then reports login throughput and the probe's
+latency percentiles. Compare runs with PASSWORD_HASH_WORKERS=0 (inline
+hashing) and the default pool:
+
+    gunicorn -c gunicorn.conf.py &
+    python benchmarks/login_storm.py --url http://localhost:5000 --logins 200 --concurrency 16
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def post_json(url, payload):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'}
+    )
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--email', default='john@example.com')
+    parser.add_argument('--password', default='user123')
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--probe-path', default='/api/health/live')
+    parser.add_argument('--probe-interval', type=float, default=0.02)
+    args = parser.parse_args()
+
+    remaining = [args.logins]
+    statuses = {}
+    lock = threading.Lock()
+    done = threading.Event()
+    probe_latencies = []
+
+    def login_worker():
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            status = post_json(args.url + '/api/auth/login', {'email': args.email, 'password': args.password})
+            with lock:
+                statuses[status] = statuses.get(status, 0) + 1
+
+    def probe_worker():
+        while not done.is_set():
+            started = time.perf_counter()
+            urllib.request.urlopen(args.url + args.probe_path).read()
+            probe_latencies.append(time.perf_counter() - started)
+            time.sleep(args.probe_interval)
+
+    probe = threading.Thread(target=probe_worker)
+    probe.start()
+    started = time.perf_counter()
+    workers = [threading.Thread(target=login_worker) for _ in range(args.concurrency)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    probe.join()
+
+    print(f'logins:           {args.logins} in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s)')
+    print(f'login statuses:   {dict(sorted(statuses.items()))}')
+    print(f'probe requests:   {len(probe_latencies)} to {args.probe_path}')
+    print(f'probe p50 / p99:  {percentile(probe_latencies, 0.50) * 1000:.1f} ms'
+          f' / {percentile(probe_latencies, 0.99) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
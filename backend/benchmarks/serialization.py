@@ -0,0 +1,95 @@
+"""Response serialization benchmark.
+
+Builds in-memory units, bookings, leases and payments, serializes them with
+their to_dict(), then times encoding each list the way a list endpoint
+would: with the standard library JSON provider, the orjson fast path and
+MessagePack. Reports the best time and body size per model and encoder:
+
+    python benchmarks/serialization.py --rows 10000
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, time as clock, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def build_rows(count):
+    from models import User, Tower, Unit, Amenity, Booking, Lease, Payment
+
+    now = datetime(2025, 1, 1, 9, 30, 15, 123456)
+    tower = Tower(id=1, name='Sunrise Tower', address='123 Main Street', total_floors=10, created_at=now)
+    user = User(id=1, email='resident@example.com', full_name='Resident Name', phone='9876543210',
+                role='resident', created_at=now)
+    amenity = Amenity(id=1, name='Swimming Pool', description='Olympic-size pool', capacity=30, created_at=now)
+    balance = {'periods_due': 12, 'expected': 12000.0, 'paid': 9000.0, 'outstanding': 3000.0,
+               'periods_overdue': 3, 'oldest_unpaid_due_date': '2024-10-01', 'days_overdue': 92}
+
+    units = [Unit(id=i, tower_id=1, tower=tower, unit_number=f'A-{i}', floor=i % 10, bedrooms=2, bathrooms=1,
+                  area_sqft=850.0, rent_amount=1500.0, status='available', description='Bright corner unit',
+                  created_at=now) for i in range(count)]
+    bookings = [Booking(id=i, user_id=1, user=user, amenity_id=1, amenity=amenity, booking_date=date(2025, 1, 2),
+                        start_time=clock(10), end_time=clock(11), status='approved', notes='Family visit',
+                        created_at=now, updated_at=now) for i in range(count)]
+    leases = [Lease(id=i, unit_id=i, unit=units[i], tenant_id=1, tenant=user, start_date=date(2024, 1, 1),
+                    end_date=date(2024, 12, 31), rent_amount=1500.0, security_deposit=3000.0, status='active',
+                    created_at=now) for i in range(count)]
+    payments = [Payment(id=i, lease_id=i, amount=1500.0, payment_date=date(2024, 1, 1) + timedelta(days=i % 365),
+                        payment_method='card', status='completed', transaction_id=f'TXN{i:08d}', created_at=now)
+                for i in range(count)]
+
+    return {
+        'units': [unit.to_dict() for unit in units],
+        'bookings': [booking.to_dict() for booking in bookings],
+        'leases': [lease.to_dict(balance=balance) for lease in leases],
+        'payments': [payment.to_dict() for payment in payments],
+    }
+
+
+def best_of(runs, fn):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DATABASE_URL', 'sqlite://')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+    from flask.json.provider import DefaultJSONProvider
+    import encoders
+    from app import create_app
+
+    app = create_app()
+    stdlib = DefaultJSONProvider(app)
+    contenders = [('json', lambda obj: stdlib.dumps(obj).encode())]
+    if encoders.orjson is not None:
+        fast = encoders.ResponseEncoder(app)
+        contenders.append(('orjson', lambda obj: fast.dumps(obj).encode()))
+    else:
+        print('orjson is not installed, skipping it')
+    if encoders.msgpack is not None:
+        contenders.append(('msgpack', encoders.pack))
+    else:
+        print('msgpack is not installed, skipping it')
+
+    with app.app_context():
+        for model, rows in build_rows(args.rows).items():
+            for label, encode in contenders:
+                seconds, body = best_of(args.runs, lambda: encode(rows))
+                print(f'{model:<10}{label:<9}{seconds * 1000:8.1f} ms {len(body) / 1024:9.0f} KiB  '
+                      f'({seconds / len(rows) * 1e6:.2f} us/row)')
+
+
+if __name__ == '__main__':
+    main()
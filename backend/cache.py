@@ -0,0 +1,155 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, g, make_response, request
+from encoders import negotiated_mimetype, vary_on_accept
+from versioning import VERSIONED_TABLES, read_versions
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+KEY_PREFIX = 'resp:'
+
+
+class LRUBackend:
+    """In-process LRU store with per-entry TTL. Also stands in for a shared store."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisBackend:
+    """Store shared by every worker, so a response rendered by one serves them all.
+
+    Each entry is a hash with the body and mimetype as plain fields, so
+    nothing read back from the shared store is ever unpickled.
+    """
+
+    def __init__(self, url):
+        if redis is None:
+            raise RuntimeError('RESPONSE_CACHE_BACKEND=redis requires the redis package')
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        body, mimetype = self._client.hmget(key, ('body', 'mimetype'))
+        if body is None or mimetype is None:
+            return None
+        return body, mimetype.decode()
+
+    def set(self, key, value, ttl):
+        body, mimetype = value
+        with self._client.pipeline() as pipe:
+            pipe.hset(key, mapping={'body': body, 'mimetype': mimetype})
+            pipe.expire(key, max(1, int(ttl)))
+            pipe.execute()
+
+    def __len__(self):
+        # The database may hold other keys; count only cached responses.
+        return sum(1 for _ in self._client.scan_iter(match=f'{KEY_PREFIX}*', count=1000))
+
+
+class ResponseCache:
+    """Cache rendered responses of read routes, tagged by the tables they read.
+
+    Cache keys embed the versions of their tables from ``table_versions``,
+    which every commit writing to a table bumps in the database. Each worker
+    therefore sees a write as soon as it commits, whichever worker made it,
+    and every entry built from older data stops matching at once; stale
+    entries are left to age out through the TTL and LRU eviction.
+    """
+
+    def __init__(self):
+        self.backend = None
+        self.ttl = 60
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        if app.config['RESPONSE_CACHE_BACKEND'] == 'redis':
+            self.backend = RedisBackend(app.config['RESPONSE_CACHE_URL'])
+        else:
+            self.backend = LRUBackend(app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+        self.ttl = app.config['RESPONSE_CACHE_TTL']
+
+    def key(self, tables):
+        # @conditional has usually read the versions for this request already.
+        versions = g.get('table_versions', {})
+        if not set(tables) <= set(versions):
+            versions, _ = read_versions(tables)
+        stamp = ','.join(f'{table}:{versions.get(table, 0)}' for table in tables)
+        args = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)))
+        return f'{KEY_PREFIX}{request.path}?{args}|{negotiated_mimetype()}|{stamp}'
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'entries': len(self.backend),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None
+        }
+
+    def cached(self, *tables):
+        """Serve a read route from the cache; entries depend on ``tables``."""
+        unversioned = set(tables) - set(VERSIONED_TABLES)
+        if unversioned:
+            raise ValueError(f'Cannot cache responses over unversioned tables: {", ".join(sorted(unversioned))}')
+
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                if self.backend is None:
+                    return fn(*args, **kwargs)
+
+                key = self.key(tables)
+                entry = self.backend.get(key)
+                if entry is not None:
+                    with self._lock:
+                        self.hits += 1
+                    body, mimetype = entry
+                    response = vary_on_accept(Response(body, mimetype=mimetype))
+                    response.headers['X-Cache'] = 'HIT'
+                    return response
+
+                with self._lock:
+                    self.misses += 1
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code == 200:
+                    self.backend.set(key, (response.get_data(), response.mimetype), self.ttl)
+                response.headers['X-Cache'] = 'MISS'
+                return response
+            return wrapper
+        return decorator
+
+
+response_cache = ResponseCache()
+
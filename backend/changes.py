@@ -0,0 +1,53 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_change_listeners = []
+_commit_listeners = []
+
+
+def on_change(listener):
+    """Call ``listener(session, tables)`` when a transaction first writes to ``tables``.
+
+    Runs inside the transaction, so the listener may issue its own statements
+    on ``session.connection()``.
+    """
+    _change_listeners.append(listener)
+    return listener
+
+
+def on_commit(listener):
+    """Call ``listener(tables)`` after each commit that wrote to ``tables``."""
+    _commit_listeners.append(listener)
+    return listener
+
+
+def mark_changed(session, *tables):
+    """Record writes the ORM cannot see, such as bulk UPDATE or INSERT statements."""
+    changed = session.info.setdefault('changed_tables', set())
+    new_tables = set(tables) - changed
+    if new_tables:
+        changed.update(new_tables)
+        for listener in _change_listeners:
+            listener(session, new_tables)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_tables(session, flush_context):
+    tables = {obj.__tablename__ for obj in session.new}
+    tables.update(obj.__tablename__ for obj in session.deleted)
+    tables.update(obj.__tablename__ for obj in session.dirty if session.is_modified(obj))
+    if tables:
+        mark_changed(session, *tables)
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_commit(session):
+    tables = session.info.pop('changed_tables', None)
+    if tables:
+        for listener in _commit_listeners:
+            listener(tables)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('changed_tables', None)
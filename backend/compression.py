@@ -0,0 +1,121 @@
+import zlib
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Only text-like bodies are worth compressing; images and archives are
+# compressed already.
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/x-ndjson', 'application/msgpack', 'text/csv', 'text/plain', 'text/html',
+}
+
+# Preferred first when the client weights several encodings equally.
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiated_encoding():
+    """The content coding the current request accepts best, or ``None`` for identity."""
+    if not response_compressor.enabled:
+        return None
+    best, best_quality = None, 0
+    for encoding in ENCODINGS:
+        quality = request.accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def _gzip(level):
+    return zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+
+class _Brotli:
+    """``brotli.Compressor`` behind the compressobj interface zlib uses."""
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self, mode=None):
+        if mode is None:
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class ResponseCompressor:
+    """Compress response bodies with gzip or brotli, as ``Accept-Encoding`` allows.
+
+    Buffered bodies are compressed whole once they reach
+    ``COMPRESS_MIN_SIZE`` bytes. Streamed bodies (exports) are compressed
+    chunk by chunk, each chunk flushed so the client can decode it on
+    arrival, whatever their total size.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self.min_size = 1024
+        self.levels = {}
+
+    def init_app(self, app):
+        self.enabled = app.config['COMPRESS_RESPONSES']
+        self.min_size = app.config['COMPRESS_MIN_SIZE']
+        self.levels = {'gzip': app.config['COMPRESS_GZIP_LEVEL'], 'br': app.config['COMPRESS_BROTLI_LEVEL']}
+        app.after_request(self.compress)
+
+    def compressor(self, encoding):
+        if encoding == 'br':
+            return _Brotli(self.levels['br'])
+        return _gzip(self.levels['gzip'])
+
+    def compress(self, response):
+        if not self.enabled or response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        # The encoding depends on Accept-Encoding even when a response ends
+        # up sent as is, and 304s must repeat the Vary of the full response.
+        response.vary.add('Accept-Encoding')
+        if (response.status_code < 200 or response.status_code in (204, 206, 304)
+                or 'Content-Encoding' in response.headers or response.direct_passthrough
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+
+        encoding = negotiated_encoding()
+        if encoding is None:
+            return response
+
+        if response.is_streamed:
+            response.response = self._stream(response, self.compressor(encoding))
+            response.headers.pop('Content-Length', None)
+        else:
+            body = response.get_data()
+            if len(body) < self.min_size:
+                return response
+            compressor = self.compressor(encoding)
+            response.set_data(compressor.compress(body) + compressor.flush())
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    @staticmethod
+    def _stream(response, compressor):
+        original = response.response
+        chunks = response.iter_encoded()
+
+        def compressed():
+            try:
+                for chunk in chunks:
+                    data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                    if data:
+                        yield data
+                yield compressor.flush()
+            finally:
+                if hasattr(original, 'close'):
+                    original.close()
+
+        return compressed()
+
+
+response_compressor = ResponseCompressor()
@@ -0,0 +1,92 @@
+from datetime import date, time
+from flask import has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+MSGPACK_MIMETYPE = 'application/msgpack'
+
+RESPONSE_ENCODERS = ('orjson', 'json')
+
+
+def negotiated_mimetype():
+    """The response format the current request asked for.
+
+    MessagePack only when the client prefers it in ``Accept`` and msgpack is
+    installed; JSON otherwise, including for ``*/*`` and missing headers.
+    """
+    if msgpack is None or not has_request_context():
+        return JSON_MIMETYPE
+    return request.accept_mimetypes.best_match([JSON_MIMETYPE, MSGPACK_MIMETYPE], default=JSON_MIMETYPE)
+
+
+def vary_on_accept(response):
+    """Mark ``response`` as negotiated on ``Accept`` when more than one format is on offer."""
+    if msgpack is not None:
+        response.vary.add('Accept')
+    return response
+
+
+def _plain(value):
+    """Encode what neither orjson nor msgpack handle natively."""
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if hasattr(value, 'item'):  # NumPy scalars
+        return value.item()
+    return DefaultJSONProvider.default(value)
+
+
+def pack(obj):
+    """``obj`` as MessagePack bytes."""
+    return msgpack.packb(obj, default=_plain, use_bin_type=True)
+
+
+class ResponseEncoder(DefaultJSONProvider):
+    """Flask JSON provider with an orjson fast path and MessagePack negotiation.
+
+    Dates, times and datetimes are ISO 8601 strings in every format, so the
+    output does not depend on which libraries are installed. Without orjson
+    (or with ``RESPONSE_ENCODER=json``) encoding falls back to the standard
+    library; without msgpack every response is JSON.
+    """
+
+    default = staticmethod(_plain)
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.fast = orjson is not None and app.config.get('RESPONSE_ENCODER', 'orjson') == 'orjson'
+
+    def _orjson_options(self, pretty):
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if pretty:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if self.fast and not kwargs:
+            return orjson.dumps(obj, default=_plain, option=self._orjson_options(False)).decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        mimetype = negotiated_mimetype()
+        if mimetype == MSGPACK_MIMETYPE:
+            body = pack(obj)
+        elif self.fast:
+            pretty = self.compact is False or (self.compact is None and self._app.debug)
+            body = orjson.dumps(obj, default=_plain, option=self._orjson_options(pretty)) + b'\n'
+        else:
+            return vary_on_accept(super().response(obj))
+
+        return vary_on_accept(self._app.response_class(body, mimetype=mimetype))
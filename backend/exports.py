@@ -0,0 +1,88 @@
+import csv
+import io
+from flask import Response, current_app, stream_with_context
+from models import Booking, Lease, Payment
+from serializers import eager, to_dicts
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MODELS = {
+    'payments': Payment,
+    'bookings': Booking,
+    'leases': Lease,
+}
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def iter_rows(model):
+    """Yield every row of ``model`` as a dict, fetched in server-side batches.
+
+    ``yield_per`` streams results from the database cursor instead of
+    buffering the whole table, and the session only holds weak references to
+    rows already serialized, so memory stays bounded by the batch size.
+    """
+    query = eager(model.query, model).order_by(model.id).yield_per(EXPORT_BATCH_SIZE)
+    batch = []
+    for obj in query:
+        batch.append(obj)
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield from to_dicts(batch, model)
+            batch = []
+    yield from to_dicts(batch, model)
+
+
+def ndjson_chunks(rows):
+    lines = []
+    for row in rows:
+        lines.append(current_app.json.dumps(row))
+        if len(lines) >= EXPORT_BATCH_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def flatten(row, prefix=''):
+    """Spread nested dicts (such as a lease's balance) over ``parent_child`` columns."""
+    flat = {}
+    for key, value in row.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{prefix}{key}_'))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+
+def csv_chunks(rows):
+    buffer = io.StringIO()
+    writer = None
+    pending = 0
+    for row in map(flatten, rows):
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(row.keys()))
+            writer.writeheader()
+        writer.writerow(row)
+        pending += 1
+        if pending >= EXPORT_BATCH_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_response(resource, fmt):
+    """Build a streaming response exporting ``resource`` as NDJSON or CSV."""
+    rows = iter_rows(EXPORT_MODELS[resource])
+    chunks = csv_chunks(rows) if fmt == 'csv' else ndjson_chunks(rows)
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={resource}.{fmt}'}
+    )
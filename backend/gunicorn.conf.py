@@ -0,0 +1,53 @@
+import os
+from datetime import datetime
+
+# Serve the app factory: gunicorn -c gunicorn.conf.py
+wsgi_app = 'app:create_app()'
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+
+def available_cpus():
+    # CPUs this process may run on, which a container's cpuset limits;
+    # cpu_count() reports every CPU of the host.
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# Threaded workers: requests mostly wait on Postgres, so a few threads per
+# process keep the CPU busy without the memory cost of more processes. With
+# threads, one process per CPU is enough; 2 * CPUs + 1 is the sizing for
+# single-threaded workers. Each worker opens up to DB_POOL_SIZE +
+# DB_MAX_OVERFLOW connections (see config.engine_options) and starts
+# PASSWORD_HASH_WORKERS hashing processes.
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+workers = int(os.environ.get('GUNICORN_WORKERS', available_cpus() if threads > 1 else available_cpus() * 2 + 1))
+
+# Import the app once in the master so workers fork with it already loaded.
+preload_app = True
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Recycle workers periodically to bound the effect of any slow leak.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = 100
+
+accesslog = '-'
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # With preload_app the app module was imported by the master; uptime
+    # should count from this worker's start.
+    import app as app_module
+    app_module.started_at = datetime.utcnow()
+
+    # Pooled connections opened in the master must not be shared with workers.
+    from models import db
+
+    app = server.app.wsgi()
+    with app.app_context():
+        db.engine.dispose(close=False)
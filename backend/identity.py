@@ -0,0 +1,93 @@
+import threading
+import time
+from functools import wraps
+from flask import g, jsonify, current_app
+from flask_jwt_extended import create_access_token, get_jwt, get_jwt_identity, jwt_required
+from models import db, User
+
+
+class Identity:
+    """The authenticated caller, as described by the access token's claims."""
+
+    def __init__(self, user_id, role):
+        self.id = user_id
+        self.role = role
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+
+def issue_token(user):
+    """Create an access token carrying the user's role and token version."""
+    return create_access_token(
+        identity=str(user.id),
+        additional_claims={'role': user.role, 'ver': user.token_version or 0}
+    )
+
+
+def current_identity():
+    """Identity of the current request, built once from the verified JWT."""
+    if 'identity' not in g:
+        g.identity = Identity(int(get_jwt_identity()), get_jwt().get('role'))
+    return g.identity
+
+
+def admin_required(fn):
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        if not current_identity().is_admin:
+            return jsonify({'error': 'Unauthorized'}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+class TokenStateCache:
+    """Recently seen ``(token_version, role)`` per user.
+
+    A token is revoked when its ``ver`` or ``role`` claim no longer matches the
+    user's row, so bumping ``User.token_version`` or changing the role takes
+    effect within ``JWT_STATE_CACHE_SECONDS`` without a query on every request.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, user_id):
+        ttl = current_app.config['JWT_STATE_CACHE_SECONDS']
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is not None and time.monotonic() - entry[0] < ttl:
+            return entry[1]
+
+        state = db.session.query(User.token_version, User.role).filter_by(id=user_id).first()
+        state = tuple(state) if state is not None else None
+        with self._lock:
+            self._entries[user_id] = (time.monotonic(), state)
+        return state
+
+    def forget(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+token_states = TokenStateCache()
+
+
+def is_token_revoked(jwt_payload):
+    if 'ver' not in jwt_payload or 'role' not in jwt_payload:
+        return True
+
+    state = token_states.get(int(jwt_payload['sub']))
+    if state is None:
+        return True
+    token_version, role = state
+    return (token_version or 0) != jwt_payload['ver'] or role != jwt_payload['role']
+
+
+def revoke_tokens(user):
+    """Invalidate every token issued to ``user`` so far; commit to apply."""
+    user.token_version = (user.token_version or 0) + 1
+    token_states.forget(user.id)
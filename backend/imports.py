@@ -0,0 +1,286 @@
+import csv
+import io
+import json
+from datetime import datetime
+from models import db, User, Tower, Unit, Lease, Payment, UNIT_STATUSES
+from changes import mark_changed
+import reporting
+from logging_setup import logger
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+IMPORT_FORMATS = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+}
+
+IMPORT_MODES = ('atomic', 'partial')
+
+
+class InvalidImport(ValueError):
+    """The upload as a whole cannot be read, as opposed to a bad row."""
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError('must be an integer')
+
+
+def _date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise ValueError('must be a YYYY-MM-DD date')
+
+
+def _non_negative(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError('must be a number')
+    if value < 0:
+        raise ValueError('must not be negative')
+    return value
+
+
+def _choice(*choices):
+    def parse(value):
+        if value not in choices:
+            raise ValueError(f'must be one of: {", ".join(choices)}')
+        return value
+    return parse
+
+
+# Per resource: the model and, for each accepted field, (parser, required,
+# default). Every row is inserted with every field so a batch can go out as
+# one executemany.
+IMPORT_SPECS = {
+    'units': (Unit, {
+        'tower_id': (_int, True, None),
+        'unit_number': (str, True, None),
+        'floor': (_int, True, None),
+        'bedrooms': (_int, True, None),
+        'bathrooms': (_int, True, None),
+        'area_sqft': (_non_negative, True, None),
+        'rent_amount': (_non_negative, True, None),
+        'status': (_choice(*UNIT_STATUSES), False, 'available'),
+        'description': (str, False, None),
+        'image_url': (str, False, None),
+    }),
+    'leases': (Lease, {
+        'unit_id': (_int, True, None),
+        'tenant_id': (_int, True, None),
+        'start_date': (_date, True, None),
+        'end_date': (_date, True, None),
+        'rent_amount': (_non_negative, True, None),
+        'security_deposit': (_non_negative, True, None),
+        'status': (_choice('active', 'expired', 'terminated'), False, 'active'),
+        'terminated_on': (_date, False, None),
+    }),
+    'payments': (Payment, {
+        'lease_id': (_int, True, None),
+        'amount': (_non_negative, True, None),
+        'payment_date': (_date, True, None),
+        'payment_method': (str, False, None),
+        'status': (_choice('pending', 'completed', 'failed'), False, 'pending'),
+        'transaction_id': (str, False, None),
+        'notes': (str, False, None),
+    }),
+}
+
+# Foreign keys checked against the database once per batch.
+IMPORT_REFERENCES = {
+    'units': {'tower_id': Tower},
+    'leases': {'unit_id': Unit, 'tenant_id': User},
+    'payments': {'lease_id': Lease},
+}
+
+
+def read_records(stream, fmt, resource):
+    """Yield ``(line, record)`` from an uploaded CSV or NDJSON byte stream.
+
+    ``record`` is a dict, or a string describing why the line could not be
+    parsed. Nothing is buffered beyond the current line.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(text)
+            fields = IMPORT_SPECS[resource][1]
+            missing = [name for name, (_, required, _) in fields.items()
+                       if required and name not in (reader.fieldnames or ())]
+            if missing:
+                raise InvalidImport(f'CSV header is missing columns: {", ".join(missing)}')
+            for record in reader:
+                yield reader.line_num, record
+            return
+
+        for line, raw in enumerate(text, start=1):
+            if not raw.strip():
+                continue
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                yield line, 'line is not valid JSON'
+                continue
+            yield line, record if isinstance(record, dict) else 'line is not a JSON object'
+    except UnicodeDecodeError:
+        raise InvalidImport('Upload is not valid UTF-8')
+
+
+def validate(fields, record):
+    """Parse ``record`` against ``fields``. Returns ``(row, errors)``."""
+    row, errors = {}, {}
+    for name, (parse, required, default) in fields.items():
+        value = record.get(name)
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == '':
+            if required:
+                errors[name] = 'is required'
+            row[name] = default
+            continue
+        try:
+            row[name] = parse(value)
+        except ValueError as e:
+            errors[name] = str(e)
+
+    if not errors and row.get('start_date') and row.get('end_date') and row['end_date'] < row['start_date']:
+        errors['end_date'] = 'must not be before start_date'
+    return row, errors
+
+
+class ImportReport:
+    def __init__(self, resource, mode):
+        self.resource = resource
+        self.mode = mode
+        self.received = 0
+        self.imported = 0
+        self.failed = 0
+        self.errors = []
+
+    def fail(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def to_dict(self):
+        return {
+            'resource': self.resource,
+            'mode': self.mode,
+            'received': self.received,
+            'imported': self.imported,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda error: error['line']),
+            'errors_truncated': self.failed > len(self.errors)
+        }
+
+
+def _missing_references(resource, batch):
+    """Report rows of ``batch`` whose foreign keys do not exist, one IN query per key."""
+    bad = {}
+    for field, target in IMPORT_REFERENCES[resource].items():
+        wanted = {row[field] for _, row in batch}
+        found = set(db.session.execute(db.select(target.id).where(target.id.in_(wanted))).scalars())
+        for line, row in batch:
+            if row[field] not in found:
+                bad.setdefault(line, {})[field] = f'{row[field]} does not exist'
+    return bad
+
+
+def _insert(resource, rows):
+    model = IMPORT_SPECS[resource][0]
+    # A list of parameter sets runs as executemany, which SQLAlchemy sends as
+    # multi-row INSERT ... VALUES batches.
+    db.session.execute(db.insert(model), rows)
+    mark_changed(db.session, model.__tablename__)
+
+    if resource == 'payments':
+        reporting.record_payments(db.session, rows)
+
+    if resource == 'leases':
+        unit_ids = {row['unit_id'] for row in rows if row['status'] == 'active'}
+        if unit_ids:
+            db.session.execute(db.update(Unit).where(Unit.id.in_(unit_ids)).values(status='occupied'))
+            mark_changed(db.session, 'units')
+
+
+def import_records(resource, records, mode):
+    """Validate and insert ``records`` in batches of ``IMPORT_BATCH_SIZE``.
+
+    In ``atomic`` mode nothing is kept if any row fails, though every row is
+    still validated for the report. In ``partial`` mode valid rows are
+    committed batch by batch and failures are only reported.
+    """
+    fields = IMPORT_SPECS[resource][1]
+    report = ImportReport(resource, mode)
+    batch = []
+
+    def flush():
+        bad = _missing_references(resource, batch)
+        for line, errors in bad.items():
+            report.fail(line, errors)
+        rows = [row for line, row in batch if line not in bad]
+        batch.clear()
+        if not rows or (mode == 'atomic' and report.failed):
+            return
+        _insert(resource, rows)
+        report.imported += len(rows)
+        if mode == 'partial':
+            db.session.commit()
+
+    try:
+        for line, record in records:
+            report.received += 1
+            if isinstance(record, str):
+                report.fail(line, {'line': record})
+                continue
+            row, errors = validate(fields, record)
+            if errors:
+                report.fail(line, errors)
+                continue
+            batch.append((line, row))
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                flush()
+        if batch:
+            flush()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if mode == 'atomic' and report.failed:
+        db.session.rollback()
+        report.imported = 0
+    else:
+        db.session.commit()
+
+    logger.info('import finished', extra={'fields': {
+        'resource': resource, 'mode': mode, 'imported': report.imported, 'failed': report.failed
+    }})
+    return report
+
+
+def import_upload(request, resource):
+    """Import the CSV or NDJSON upload of ``request``: a raw body or a multipart ``file``."""
+    mode = request.args.get('mode', 'atomic')
+    if mode not in IMPORT_MODES:
+        raise InvalidImport(f'mode must be one of: {", ".join(IMPORT_MODES)}')
+
+    upload = request.files.get('file')
+    if upload is not None:
+        stream, mimetype = upload.stream, upload.mimetype
+        if upload.filename and upload.filename.endswith(('.csv', '.ndjson', '.jsonl')):
+            mimetype = 'text/csv' if upload.filename.endswith('.csv') else 'application/x-ndjson'
+    else:
+        stream, mimetype = request.stream, request.mimetype
+
+    fmt = request.args.get('format') or IMPORT_FORMATS.get(mimetype)
+    if fmt not in IMPORT_FORMATS.values():
+        raise InvalidImport('Send text/csv or application/x-ndjson, or pass format=csv|ndjson')
+
+    if not isinstance(stream, io.BufferedIOBase):
+        stream = io.BufferedReader(stream)
+    return import_records(resource, read_records(stream, fmt, resource), mode)
@@ -0,0 +1,149 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from datetime import datetime
+from flask import g, has_request_context, request
+
+logger = logging.getLogger('rental_portal')
+
+REDACTED = '[REDACTED]'
+SECRET_FIELDS = {'password', 'password_hash', 'access_token', 'token', 'authorization', 'jwt_payload', 'secret'}
+SECRET_PATTERNS = [
+    re.compile(r'(?i)(bearer\s+)\S+'),
+    re.compile(r'eyJ[\w-]+\.[\w-]+\.[\w-]*'),  # anything shaped like a JWT
+]
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {key: REDACTED if key.lower() in SECRET_FIELDS else redact(item) for key, item in value.items()}
+    if isinstance(value, str):
+        for pattern in SECRET_PATTERNS:
+            value = pattern.sub(lambda m: (m.group(1) if m.groups() else '') + REDACTED, value)
+    return value
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the current request, in the thread that logs them."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.method = request.method
+            record.path = request.path
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a ``rate`` fraction of records below WARNING."""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.utcfromtimestamp(record.created).isoformat(timespec='milliseconds') + 'Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': redact(record.getMessage()),
+        }
+        for key in ('request_id', 'method', 'path'):
+            if getattr(record, key, None) is not None:
+                entry[key] = getattr(record, key)
+        if getattr(record, 'fields', None):
+            entry.update(redact(record.fields))
+        if record.exc_text:
+            entry['exception'] = redact(record.exc_text)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full."""
+
+    dropped = 0
+
+    def prepare(self, record):
+        # Merge arguments and render the traceback now, while they are still
+        # valid; the JSON formatting happens on the listener thread.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+_listener = None
+
+
+def _start_listener(log_queue):
+    global _listener
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+    _listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=False)
+    _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def configure_logging(app):
+    """Send application logs through a queue drained by a background thread.
+
+    Request threads only stamp the record and enqueue it; formatting,
+    redaction and the write to stdout happen on the listener thread.
+    """
+    if not logger.handlers:
+        log_queue = queue.Queue(maxsize=app.config['LOG_QUEUE_SIZE'])
+        handler = DroppingQueueHandler(log_queue)
+        handler.addFilter(SamplingFilter(app.config['LOG_SAMPLE_RATE']))
+        handler.addFilter(RequestContextFilter())
+        logger.addHandler(handler)
+        logger.propagate = False
+
+        _start_listener(log_queue)
+        atexit.register(_stop_listener)
+        # The listener thread does not survive gunicorn's fork of a preloaded app
+        os.register_at_fork(after_in_child=lambda: _start_listener(log_queue))
+
+    logger.setLevel(app.config['LOG_LEVEL'])
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def log_request(response):
+        if 'request_id' in g:
+            response.headers['X-Request-ID'] = g.request_id
+        if 'request_started' in g:
+            logger.info('request completed', extra={'fields': {
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - g.request_started) * 1000, 2)
+            }})
+        return response
@@ -0,0 +1,260 @@
+from contextlib import contextmanager
+from datetime import date, datetime
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, inspect, select, text
+from models import db, User, Tower, Unit, Amenity, AmenityDay, Booking, Lease, Payment, TableVersion, RevenueRollup
+import availability
+import text_search
+import reporting
+from account import tenant_leases, tenant_payments
+from pagination import DEFAULT_PAGE_SIZE, keyset_query
+
+# Kept out of db.metadata so create_all() never touches it.
+migration_metadata = MetaData()
+
+schema_migrations = Table(
+    'schema_migrations', migration_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(255), nullable=False),
+    Column('applied_at', DateTime, nullable=False, default=datetime.utcnow),
+)
+
+MIGRATIONS = []
+
+
+def migration(version, description):
+    """Register ``fn(conn)`` as schema migration ``version``.
+
+    Migrations run in version order inside one transaction and are recorded
+    in ``schema_migrations``; each must leave an already-migrated database
+    unchanged, since version 1 may adopt tables created before this module.
+    """
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+
+@migration(1, 'Initial schema')
+def initial_schema(conn):
+    tables = [model.__table__ for model in (User, Tower, Unit, Amenity, Booking, Lease, Payment)]
+    db.metadata.create_all(conn, tables=tables)
+
+
+# Each index matches the filter and sort of a route in app.py. Keyset pages
+# order by (created_at DESC, id DESC), so the list indexes end with those.
+HOT_PATH_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS ix_bookings_user_created ON bookings (user_id, created_at DESC, id DESC)',
+    'CREATE INDEX IF NOT EXISTS ix_bookings_created ON bookings (created_at DESC, id DESC)',
+    'CREATE INDEX IF NOT EXISTS ix_bookings_amenity_date ON bookings (amenity_id, booking_date)',
+    "CREATE INDEX IF NOT EXISTS ix_bookings_pending ON bookings (status) WHERE status = 'pending'",
+    'CREATE INDEX IF NOT EXISTS ix_leases_tenant_created ON leases (tenant_id, created_at DESC, id DESC)',
+    'CREATE INDEX IF NOT EXISTS ix_leases_created ON leases (created_at DESC, id DESC)',
+    'CREATE INDEX IF NOT EXISTS ix_leases_unit ON leases (unit_id)',
+    "CREATE INDEX IF NOT EXISTS ix_leases_active ON leases (status) WHERE status = 'active'",
+    'CREATE INDEX IF NOT EXISTS ix_payments_lease_created ON payments (lease_id, created_at DESC, id DESC)',
+    'CREATE INDEX IF NOT EXISTS ix_payments_created ON payments (created_at DESC, id DESC)',
+    "CREATE INDEX IF NOT EXISTS ix_payments_completed ON payments (amount) WHERE status = 'completed'",
+    'CREATE INDEX IF NOT EXISTS ix_units_tower_status ON units (tower_id, status)',
+    'CREATE INDEX IF NOT EXISTS ix_units_status_created ON units (status, created_at DESC, id DESC)',
+    'CREATE INDEX IF NOT EXISTS ix_units_created ON units (created_at DESC, id DESC)',
+    'CREATE INDEX IF NOT EXISTS ix_users_role_created ON users (role, created_at DESC, id DESC)',
+]
+
+
+@migration(2, 'Indexes for route filters and keyset ordering')
+def hot_path_indexes(conn):
+    for statement in HOT_PATH_INDEXES:
+        conn.execute(text(statement))
+
+
+@migration(3, 'Amenity slot occupancy table')
+def amenity_days(conn):
+    AmenityDay.__table__.create(conn, checkfirst=True)
+    availability.backfill_occupancy(conn)
+
+
+@migration(4, 'Token version for revoking issued JWTs')
+def user_token_version(conn):
+    add_column(conn, 'users', 'token_version', 'INTEGER NOT NULL DEFAULT 0')
+
+
+@migration(5, 'Per-table version counters for conditional GETs')
+def table_versions(conn):
+    TableVersion.__table__.create(conn, checkfirst=True)
+    existing = set(conn.execute(select(TableVersion.name)).scalars())
+    for name in ('towers', 'units', 'amenities'):
+        if name not in existing:
+            conn.execute(TableVersion.__table__.insert().values(name=name, version=1, updated_at=datetime.utcnow()))
+
+
+# Composite indexes for /api/units/search when it runs as SQL, plus the
+# updated_at index the in-memory search index refreshes from.
+UNIT_SEARCH_INDEXES = [
+    'CREATE INDEX IF NOT EXISTS ix_units_status_bedrooms_rent ON units (status, bedrooms, rent_amount)',
+    'CREATE INDEX IF NOT EXISTS ix_units_status_rent ON units (status, rent_amount)',
+    'CREATE INDEX IF NOT EXISTS ix_units_bedrooms_rent ON units (bedrooms, rent_amount)',
+    'CREATE INDEX IF NOT EXISTS ix_units_updated ON units (updated_at)',
+]
+
+
+@migration(6, 'Unit updated_at and composite indexes for unit search')
+def unit_search_indexes(conn):
+    add_column(conn, 'units', 'updated_at', 'TIMESTAMP')
+    conn.execute(text('UPDATE units SET updated_at = created_at WHERE updated_at IS NULL'))
+    for statement in UNIT_SEARCH_INDEXES:
+        conn.execute(text(statement))
+
+
+@migration(7, 'Full-text search vectors on units and amenities')
+def text_search_vectors(conn):
+    # Other dialects search with the in-memory index in text_search.py.
+    if conn.dialect.name != 'postgresql':
+        return
+    for table, (_, fields) in text_search.SEARCH_FIELDS.items():
+        document = ' || '.join(
+            f"setweight(to_tsvector('english', coalesce({column}, '')), '{weight}')" for column, weight in fields
+        )
+        add_column(conn, table, 'search_vector', f'tsvector GENERATED ALWAYS AS ({document}) STORED')
+        conn.execute(text(f'CREATE INDEX IF NOT EXISTS ix_{table}_search ON {table} USING GIN (search_vector)'))
+
+
+@migration(8, 'Revenue rollups by day and month, tower, method and status')
+def revenue_rollups(conn):
+    RevenueRollup.__table__.create(conn, checkfirst=True)
+    reporting.rebuild_rollups(conn)
+
+
+@migration(9, 'Covering index for per-lease payment totals')
+def payment_totals_index(conn):
+    # Serves the arrears engine's completed-payments-per-lease aggregate from the index alone.
+    conn.execute(text(
+        'CREATE INDEX IF NOT EXISTS ix_payments_status_lease ON payments (status, lease_id, payment_date, amount)'
+    ))
+
+
+@migration(10, 'Termination date of leases')
+def lease_terminated_on(conn):
+    # Terminated leases from before this migration have no date and accrue no rent.
+    add_column(conn, 'leases', 'terminated_on', 'DATE')
+
+
+def add_column(conn, table, column, ddl):
+    """Add ``column`` unless the table was created with it already."""
+    if column not in {col['name'] for col in inspect(conn).get_columns(table)}:
+        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+
+
+def applied_versions(conn):
+    migration_metadata.create_all(conn)
+    return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+
+def pending_versions():
+    """Versions not yet applied; also serves as a database connectivity check."""
+    with db.engine.connect() as conn:
+        if not inspect(conn).has_table('schema_migrations'):
+            return [version for version, _, _ in MIGRATIONS]
+        done = set(conn.execute(select(schema_migrations.c.version)).scalars())
+    return [version for version, _, _ in MIGRATIONS if version not in done]
+
+
+# Arbitrary application-wide key for pg_advisory_lock.
+BOOTSTRAP_LOCK_ID = 724_310_001
+
+
+@contextmanager
+def bootstrap_lock():
+    """Hold a Postgres advisory lock so only one process bootstraps at a time.
+
+    Other dialects have no cross-process lock and run unserialized.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        yield
+        return
+
+    with db.engine.connect() as conn:
+        conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': BOOTSTRAP_LOCK_ID})
+        try:
+            yield
+        finally:
+            conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': BOOTSTRAP_LOCK_ID})
+            conn.commit()
+
+
+def upgrade():
+    """Apply every pending migration. Returns the versions applied."""
+    applied = []
+    with db.engine.begin() as conn:
+        done = applied_versions(conn)
+        for version, description, fn in MIGRATIONS:
+            if version in done:
+                continue
+            fn(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version, description=description, applied_at=datetime.utcnow()
+            ))
+            applied.append(version)
+    return applied
+
+
+# ============= Query plan check =============
+
+# The queries behind each route's filter and sort, with representative values.
+# Built from the same query functions the routes use, so the plans checked
+# here are the plans the endpoints run. List pages are the first keyset page.
+HOT_QUERIES = {
+    'get_bookings (admin)': lambda: keyset_query(Booking.query, Booking, DEFAULT_PAGE_SIZE),
+    'get_bookings (resident)': lambda: keyset_query(Booking.query.filter_by(user_id=1), Booking, DEFAULT_PAGE_SIZE),
+    'bookings by amenity and day': lambda: Booking.query.filter_by(amenity_id=1, booking_date=date.today()),
+    'pending bookings count': lambda: db.session.query(db.func.count(Booking.id)).filter(Booking.status == 'pending'),
+    'get_leases (admin)': lambda: keyset_query(Lease.query, Lease, DEFAULT_PAGE_SIZE),
+    'get_leases (resident)': lambda: keyset_query(tenant_leases(1), Lease, DEFAULT_PAGE_SIZE),
+    'leases by unit': lambda: Lease.query.filter_by(unit_id=1),
+    'active leases count': lambda: db.session.query(db.func.count(Lease.id)).filter(Lease.status == 'active'),
+    'get_payments (admin)': lambda: keyset_query(Payment.query, Payment, DEFAULT_PAGE_SIZE),
+    'get_payments (resident)': lambda: keyset_query(tenant_payments(1), Payment, DEFAULT_PAGE_SIZE),
+    'completed revenue': lambda: db.session.query(db.func.sum(RevenueRollup.amount))
+        .filter(RevenueRollup.period == 'month', RevenueRollup.status == 'completed'),
+    'revenue report (monthly)': lambda: db.session.query(RevenueRollup)
+        .filter(RevenueRollup.period == 'month', RevenueRollup.bucket >= date(2024, 1, 1)),
+    'get_towers (unit counts)': lambda: Tower.unit_counts_query(),
+    'get_units (page)': lambda: keyset_query(Unit.query, Unit, DEFAULT_PAGE_SIZE),
+    'get_units (status, tower)': lambda: Unit.query.filter_by(status='available', tower_id=1),
+    'get_units (status page)': lambda: keyset_query(Unit.query.filter_by(status='available'), Unit, DEFAULT_PAGE_SIZE),
+    'unit search (status, bedrooms, rent)': lambda: Unit.query
+        .filter(Unit.status == 'available', Unit.bedrooms == 2, Unit.rent_amount.between(1000, 3000))
+        .order_by(Unit.rent_amount).limit(20),
+    'unit search refresh': lambda: db.session.query(Unit.id).filter(Unit.updated_at >= datetime(2024, 1, 1)),
+    'payment totals per lease': lambda: db.session.query(Payment.lease_id, db.func.sum(Payment.amount))
+        .filter(Payment.status == 'completed', Payment.payment_date <= date(2024, 12, 31)).group_by(Payment.lease_id),
+    'get_users': lambda: keyset_query(User.query.filter_by(role='resident'), User, DEFAULT_PAGE_SIZE),
+}
+
+
+def explain_hot_queries():
+    """EXPLAIN every query in ``HOT_QUERIES``.
+
+    Returns ``[(name, plan_lines, uses_index)]``. On Postgres sequential scans
+    are disabled for the check so the plan shows whether an index can serve
+    the query at all, rather than what the planner picks for a small table.
+    """
+    results = []
+    dialect = db.engine.dialect
+    postgres = dialect.name == 'postgresql'
+
+    with db.engine.connect() as conn:
+        if postgres:
+            conn.execute(text('SET LOCAL enable_seqscan = off'))
+        for name, build in HOT_QUERIES.items():
+            sql = str(build().statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+            if postgres:
+                plan = [row[0] for row in conn.exec_driver_sql('EXPLAIN ' + sql)]
+                uses_index = not any('Seq Scan' in line for line in plan)
+            else:
+                plan = [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + sql)]
+                uses_index = not any(line.startswith('SCAN') and 'INDEX' not in line for line in plan)
+            results.append((name, plan, uses_index))
+        conn.rollback()
+
+    return results
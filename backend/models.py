@@ -1,9 +1,12 @@
 from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from datetime import date, datetime
+from sqlalchemy.orm import validates
 
 db = SQLAlchemy()
 
+UNIT_STATUSES = ('available', 'occupied', 'maintenance')
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -13,6 +16,7 @@ class User(db.Model):
     full_name = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(20))
     role = db.Column(db.String(20), nullable=False, default='resident')  # admin, resident
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # bump to revoke issued tokens
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -48,14 +52,38 @@ class Tower(db.Model):
     # Relationships
     units = db.relationship('Unit', back_populates='tower', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
+    @staticmethod
+    def unit_counts_query(tower_ids=None):
+        """``(tower_id, status, count)`` rows for the units of ``tower_ids``, or of every tower."""
+        query = db.session.query(Unit.tower_id, Unit.status, db.func.count(Unit.id)) \
+            .group_by(Unit.tower_id, Unit.status)
+        if tower_ids is not None:
+            query = query.filter(Unit.tower_id.in_(tower_ids))
+        return query
+    
+    @staticmethod
+    def unit_counts(tower_ids=None):
+        """Count units per tower and status with one grouped query.
+
+        Returns ``{tower_id: {status: count}}``; towers without units are absent.
+        """
+        counts = {}
+        for tower_id, status, count in Tower.unit_counts_query(tower_ids):
+            counts.setdefault(tower_id, {})[status] = count
+        return counts
+    
+    def to_dict(self, unit_counts=None):
+        if unit_counts is None:
+            unit_counts = Tower.unit_counts([self.id]).get(self.id, {})
+        
         return {
             'id': self.id,
             'name': self.name,
             'address': self.address,
             'total_floors': self.total_floors,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'total_units': len(self.units)
+            'total_units': sum(unit_counts.values()),
+            'units_by_status': {status: unit_counts.get(status, 0) for status in UNIT_STATUSES}
         }
 
 
@@ -74,6 +102,7 @@ class Unit(db.Model):
     description = db.Column(db.Text)
     image_url = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # drives unit search refreshes
     
     # Relationships
     tower = db.relationship('Tower', back_populates='units')
@@ -111,6 +140,7 @@ class Amenity(db.Model):
     
     # Relationships
     bookings = db.relationship('Booking', back_populates='amenity', lazy=True)
+    slot_days = db.relationship('AmenityDay', lazy=True, cascade='all, delete-orphan')
     
     def to_dict(self):
         return {
@@ -125,6 +155,14 @@ class Amenity(db.Model):
         }
 
 
+class AmenityDay(db.Model):
+    __tablename__ = 'amenity_days'
+    
+    amenity_id = db.Column(db.Integer, db.ForeignKey('amenities.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    occupancy = db.Column(db.LargeBinary, nullable=False)  # bookings per slot, see availability.py
+
+
 class Booking(db.Model):
     __tablename__ = 'bookings'
     
@@ -174,6 +212,7 @@ class Lease(db.Model):
     rent_amount = db.Column(db.Float, nullable=False)
     security_deposit = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(20), default='active')  # active, expired, terminated
+    terminated_on = db.Column(db.Date)  # rent stops falling due after this day
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relationships
@@ -181,7 +220,16 @@ class Lease(db.Model):
     tenant = db.relationship('User', back_populates='leases')
     payments = db.relationship('Payment', back_populates='lease', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
+    @validates('status')
+    def _record_termination(self, key, status):
+        if status == 'terminated' and self.status != 'terminated':
+            self.terminated_on = self.terminated_on or date.today()
+        elif status != 'terminated':
+            self.terminated_on = None
+        return status
+    
+    def to_dict(self, balance=None):
+        """``balance`` comes from ``arrears.lease_balances``; serializers.to_dicts fills it in."""
         return {
             'id': self.id,
             'unit_id': self.unit_id,
@@ -195,6 +243,8 @@ class Lease(db.Model):
             'rent_amount': self.rent_amount,
             'security_deposit': self.security_deposit,
             'status': self.status,
+            'terminated_on': self.terminated_on.isoformat() if self.terminated_on else None,
+            'balance': balance,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -227,3 +277,23 @@ class Payment(db.Model):
             'notes': self.notes,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_versions'
+    
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+class RevenueRollup(db.Model):
+    __tablename__ = 'revenue_rollups'
+    
+    period = db.Column(db.String(5), primary_key=True)  # day, month
+    bucket = db.Column(db.Date, primary_key=True)  # the day, or the first of the month
+    tower_id = db.Column(db.Integer, primary_key=True)
+    payment_method = db.Column(db.String(50), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    payment_count = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Float, nullable=False, default=0)
@@ -0,0 +1,44 @@
+from models import db, Booking
+from changes import mark_changed
+from scheduling import ACTIVE_BOOKING_STATUSES
+import availability
+
+MODERATION_STATUSES = ('approved', 'declined')
+MAX_MODERATION_BATCH = 1000
+
+
+def moderate_bookings(ids, status, admin_notes=None):
+    """Approve or decline the pending bookings ``ids`` with one UPDATE.
+
+    The UPDATE only matches rows that are still pending when it runs, so a
+    booking moderated or cancelled by someone else in the meantime is
+    reported instead of overwritten. Pending bookings already hold their
+    slot, so approving needs no capacity check; declining frees the slots of
+    every declined booking in one pass.
+
+    Returns ``{id: {'ok': bool, 'status': current status or None}}``.
+    """
+    bookings = Booking.__table__
+    values = {'status': status}
+    if admin_notes is not None:
+        values['admin_notes'] = admin_notes
+
+    changed = db.session.execute(
+        bookings.update()
+        .where(bookings.c.id.in_(ids), bookings.c.status == 'pending')
+        .values(**values)
+        .returning(bookings.c.id, bookings.c.amenity_id, bookings.c.booking_date,
+                   bookings.c.start_time, bookings.c.end_time)
+    ).all()
+    mark_changed(db.session, 'bookings')
+
+    if status not in ACTIVE_BOOKING_STATUSES:
+        availability.release_slots(tuple(row)[1:] for row in changed)
+
+    results = {row.id: {'ok': True, 'status': status} for row in changed}
+    skipped = set(ids) - set(results)
+    if skipped:
+        current = dict(db.session.query(Booking.id, Booking.status).filter(Booking.id.in_(skipped)))
+        for ident in skipped:
+            results[ident] = {'ok': False, 'status': current.get(ident)}
+    return results
@@ -0,0 +1,85 @@
+import base64
+import json
+from datetime import datetime
+from flask import request
+from sqlalchemy import tuple_
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Ranked and sorted results (searches, reports) page by offset instead.
+DEFAULT_OFFSET_PAGE_SIZE = 20
+MAX_OFFSET_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, ident):
+    payload = json.dumps([created_at.isoformat() if created_at else None, ident])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, ident = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), int(ident)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def page_args():
+    """Read ``limit`` and ``cursor`` from the query string.
+
+    Returns ``None`` when the client asked for neither, otherwise
+    ``(limit, cursor)`` with the cursor decoded.
+    """
+    limit = request.args.get('limit')
+    cursor = request.args.get('cursor')
+    if limit is None and cursor is None:
+        return None
+
+    try:
+        limit = int(limit) if limit is not None else DEFAULT_PAGE_SIZE
+    except ValueError:
+        raise InvalidCursor('limit must be an integer')
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    return limit, decode_cursor(cursor) if cursor else None
+
+
+def offset_page_args(args):
+    """Read ``limit`` (capped at ``MAX_OFFSET_PAGE_SIZE``) and ``offset`` from ``args``."""
+    try:
+        limit = int(args.get('limit', DEFAULT_OFFSET_PAGE_SIZE))
+        offset = int(args.get('offset', 0))
+    except ValueError:
+        raise InvalidCursor('limit and offset must be integers')
+    if limit < 1 or offset < 0:
+        raise InvalidCursor('limit must be positive and offset non-negative')
+    return min(limit, MAX_OFFSET_PAGE_SIZE), offset
+
+
+def keyset_query(query, model, limit, cursor=None):
+    """``query`` narrowed to the page after ``cursor``, plus one row to tell whether more follow."""
+    query = query.order_by(None).order_by(model.created_at.desc(), model.id.desc())
+    if cursor is not None:
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(*cursor))
+    return query.limit(limit + 1)
+
+
+def keyset_page(query, model, limit, cursor=None):
+    """Fetch one page of ``query`` ordered newest first by ``(created_at, id)``.
+
+    The cursor is the key of the last row of the previous page, so each page is
+    a range scan on that key instead of an OFFSET skip. Returns
+    ``(rows, next_cursor)``; ``next_cursor`` is ``None`` on the last page.
+    """
+    rows = keyset_query(query, model, limit, cursor).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last.created_at, last.id)
@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+from logging_setup import logger
+
+
+class HashingBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Hash and verify passwords in a bounded pool of worker processes.
+
+    Werkzeug's scrypt holds the GIL for its whole run, so hashing inline stalls
+    every other request thread of the gunicorn worker. Work is sent to
+    ``PASSWORD_HASH_WORKERS`` processes instead. At most
+    ``PASSWORD_HASH_QUEUE`` further requests wait for a free process. Any
+    beyond that wait up to ``PASSWORD_HASH_QUEUE_TIMEOUT`` seconds for a slot,
+    then fail with ``HashingBusy``. With ``PASSWORD_HASH_WORKERS = 0`` hashing
+    runs inline. A pool whose process died is replaced and the operation
+    retried once.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        self._method_prefixes = {}
+
+    def _pool(self):
+        # Pools do not survive fork, so each gunicorn worker starts its own.
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                config = current_app.config
+                workers = config['PASSWORD_HASH_WORKERS']
+                self._executor = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+                self._slots = threading.BoundedSemaphore(workers + config['PASSWORD_HASH_QUEUE'])
+                self._pid = os.getpid()
+            return self._executor, self._slots
+
+    def _discard(self, executor):
+        """Drop ``executor`` so the next call builds a fresh pool, unless another thread already has."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _run(self, fn, *args):
+        if current_app.config['PASSWORD_HASH_WORKERS'] <= 0:
+            return fn(*args)
+
+        for attempt in range(2):
+            executor, slots = self._pool()
+            if not slots.acquire(timeout=current_app.config['PASSWORD_HASH_QUEUE_TIMEOUT']):
+                raise HashingBusy('Too many concurrent password operations')
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                # A hashing process was killed (OOM, signal); every later
+                # submit to this pool would fail too.
+                logger.warning('password hashing pool broken, restarting it', extra={'fields': {'attempt': attempt}})
+                self._discard(executor)
+            finally:
+                slots.release()
+        raise HashingBusy('Password hashing pool is restarting')
+
+    @property
+    def method(self):
+        return current_app.config['PASSWORD_HASH_METHOD']
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, pwhash, password):
+        return self._run(check_password_hash, pwhash, password)
+
+    def needs_rehash(self, pwhash):
+        """Whether ``pwhash`` was made with other parameters than the configured method."""
+        method = self.method
+        if method not in self._method_prefixes:
+            # Werkzeug fills in default parameters, e.g. 'scrypt' -> 'scrypt:32768:8:1'
+            self._method_prefixes[method] = generate_password_hash('', method).split('$', 1)[0]
+        return pwhash.split('$', 1)[0] != self._method_prefixes[method]
+
+
+password_hasher = PasswordHasher()
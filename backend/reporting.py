@@ -0,0 +1,203 @@
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from logging_setup import logger
+from models import db, Tower, Unit, Lease, Payment, RevenueRollup
+
+REPORT_PERIODS = ('day', 'month')
+
+# group_by name -> rollup column
+REPORT_DIMENSIONS = {
+    'tower': 'tower_id',
+    'method': 'payment_method',
+    'status': 'status',
+}
+
+UNSPECIFIED_METHOD = 'unspecified'
+
+ROLLED_UP_FIELDS = ('lease_id', 'payment_date', 'payment_method', 'status', 'amount')
+
+rollups = RevenueRollup.__table__
+
+
+class InvalidReport(ValueError):
+    pass
+
+
+def rollup_rows(entries):
+    """Fold ``(tower_id, payment_date, method, status, count, amount)`` entries
+    into one row per period, bucket, tower, method and status."""
+    totals = defaultdict(lambda: [0, 0.0])
+    for tower_id, payment_date, method, status, count, amount in entries:
+        for period, bucket in (('day', payment_date), ('month', payment_date.replace(day=1))):
+            total = totals[(period, bucket, tower_id, method or UNSPECIFIED_METHOD, status)]
+            total[0] += count
+            total[1] += amount or 0
+    return [
+        {'period': period, 'bucket': bucket, 'tower_id': tower_id, 'payment_method': method,
+         'status': status, 'payment_count': count, 'amount': amount}
+        for (period, bucket, tower_id, method, status), (count, amount) in totals.items()
+        if count or amount
+    ]
+
+
+def apply_deltas(conn, rows):
+    """Add ``rows`` onto the rollups with one INSERT ... ON CONFLICT DO UPDATE."""
+    if not rows:
+        return
+    insert = postgresql.insert if conn.dialect.name == 'postgresql' else sqlite.insert
+    statement = insert(rollups)
+    statement = statement.on_conflict_do_update(
+        index_elements=list(rollups.primary_key.columns),
+        set_={
+            'payment_count': rollups.c.payment_count + statement.excluded.payment_count,
+            'amount': rollups.c.amount + statement.excluded.amount,
+        }
+    )
+    conn.execute(statement, rows)
+
+
+def record_payments(session, payments, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) payments from the rollups.
+
+    ``payments`` are dicts with the ``ROLLED_UP_FIELDS``. Runs in the
+    session's transaction, so the rollups commit or roll back with the
+    payments themselves. Bulk inserts that bypass the ORM must call this;
+    ORM changes are picked up by the flush hooks below.
+    """
+    payments = [payment for payment in payments if payment['payment_date']]
+    if not payments:
+        return
+    conn = session.connection()
+    towers = dict(conn.execute(
+        db.select(Lease.id, Unit.tower_id).join(Unit, Lease.unit_id == Unit.id)
+        .where(Lease.id.in_({payment['lease_id'] for payment in payments}))
+    ).all())
+    missing = [payment for payment in payments if payment['lease_id'] not in towers]
+    if missing:
+        logger.warning('Payments left out of the revenue rollups: lease not found', extra={'fields': {
+            'lease_ids': sorted({payment['lease_id'] for payment in missing}), 'sign': sign}})
+    apply_deltas(conn, rollup_rows(
+        (towers[payment['lease_id']], payment['payment_date'], payment['payment_method'], payment['status'],
+         sign, sign * (payment['amount'] or 0))
+        for payment in payments if payment['lease_id'] in towers
+    ))
+
+
+def _current_values(payment):
+    return {field: getattr(payment, field) for field in ROLLED_UP_FIELDS}
+
+
+def _committed_values(payment):
+    attrs = inspect(payment).attrs
+    return {field: attrs[field].history.deleted[0] if attrs[field].history.deleted else getattr(payment, field)
+            for field in ROLLED_UP_FIELDS}
+
+
+@event.listens_for(Session, 'before_flush')
+def _roll_up_payment_changes(session, flush_context, instances):
+    # Removals before the flush, so payments removed by a lease's delete
+    # cascade can still be traced to their tower. Additions wait for
+    # after_flush: a payment attached through ``lease.payments`` or
+    # ``Payment(lease=...)`` has no lease_id until the flush sets it.
+    removed = []
+    for payment in session.deleted:
+        if isinstance(payment, Payment):
+            removed.append(_committed_values(payment))
+    session.info['modified_payments'] = [
+        (payment, _committed_values(payment)) for payment in session.dirty
+        if isinstance(payment, Payment) and session.is_modified(payment)
+    ]
+    record_payments(session, removed, sign=-1)
+
+
+@event.listens_for(Session, 'after_flush')
+def _roll_up_flushed_payments(session, flush_context):
+    added, removed = [], []
+    for payment in session.new:
+        if isinstance(payment, Payment):
+            added.append(_current_values(payment))
+    for payment, before in session.info.pop('modified_payments', ()):
+        after = _current_values(payment)
+        if before != after:
+            removed.append(before)
+            added.append(after)
+    record_payments(session, removed, sign=-1)
+    record_payments(session, added)
+
+
+def rebuild_rollups(conn):
+    """Recompute every rollup row from the payments table."""
+    totals = conn.execute(
+        db.select(Unit.tower_id, Payment.payment_date, Payment.payment_method, Payment.status,
+                  db.func.count(Payment.id), db.func.sum(Payment.amount))
+        .join(Lease, Payment.lease_id == Lease.id)
+        .join(Unit, Lease.unit_id == Unit.id)
+        .group_by(Unit.tower_id, Payment.payment_date, Payment.payment_method, Payment.status)
+    )
+    rows = rollup_rows(totals)
+    conn.execute(rollups.delete())
+    if rows:
+        conn.execute(rollups.insert(), rows)
+    return len(rows)
+
+
+def _parse_date(name, value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise InvalidReport(f'{name} must be a YYYY-MM-DD date')
+
+
+def revenue_report(args):
+    """Revenue per day or month, optionally split by tower, method and status.
+
+    Reads only the rollup table: a year of monthly figures is at most 12 rows
+    per tower, method and status, however many payments there are.
+    """
+    period = args.get('period', 'month')
+    if period not in REPORT_PERIODS:
+        raise InvalidReport(f'period must be one of: {", ".join(REPORT_PERIODS)}')
+    group_by = [name for name in args.get('group_by', '').split(',') if name]
+    if not set(group_by) <= set(REPORT_DIMENSIONS):
+        raise InvalidReport(f'group_by must be a list of: {", ".join(REPORT_DIMENSIONS)}')
+    statuses = args.get('status', 'completed')
+
+    dimensions = [rollups.c[REPORT_DIMENSIONS[name]] for name in group_by]
+    query = db.select(
+        rollups.c.bucket, *dimensions, db.func.sum(rollups.c.payment_count), db.func.sum(rollups.c.amount)
+    ).where(rollups.c.period == period).group_by(rollups.c.bucket, *dimensions) \
+        .order_by(rollups.c.bucket, *dimensions)
+    if statuses != 'all':
+        query = query.where(rollups.c.status.in_(statuses.split(',')))
+    if args.get('from'):
+        start = _parse_date('from', args['from'])
+        query = query.where(rollups.c.bucket >= (start.replace(day=1) if period == 'month' else start))
+    if args.get('to'):
+        query = query.where(rollups.c.bucket <= _parse_date('to', args['to']))
+
+    tower_names = dict(db.session.query(Tower.id, Tower.name)) if 'tower' in group_by else {}
+    rows = []
+    for bucket, *values, count, amount in db.session.execute(query):
+        if not count:
+            continue
+        row = {'bucket': bucket.isoformat()}
+        for name, value in zip(group_by, values):
+            row[REPORT_DIMENSIONS[name]] = value
+            if name == 'tower':
+                row['tower_name'] = tower_names.get(value)
+        row.update(payments=count, amount=round(amount, 2))
+        rows.append(row)
+
+    return {
+        'period': period,
+        'group_by': group_by,
+        'status': statuses,
+        'rows': rows,
+        'totals': {
+            'payments': sum(row['payments'] for row in rows),
+            'amount': round(sum(row['amount'] for row in rows), 2)
+        }
+    }
@@ -0,0 +1,80 @@
+from bisect import bisect_right
+from models import db, Amenity, Booking
+
+# Bookings in these states hold their slot; declined and cancelled ones free it.
+ACTIVE_BOOKING_STATUSES = ('pending', 'approved')
+
+
+class SlotUnavailable(Exception):
+    def __init__(self, message, status_code=409):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+class DaySchedule:
+    """Bookings of one amenity on one day, as sorted start and end minutes.
+
+    Intervals are half-open, so a booking ending at 11:00 does not overlap one
+    starting at 11:00. The number of bookings in progress at minute ``t`` is
+    ``#starts <= t - #ends <= t``, so the peak over a requested range only has
+    to be evaluated at its start and at the existing starts inside it, each a
+    binary search.
+    """
+
+    def __init__(self, intervals=()):
+        intervals = list(intervals)
+        self.starts = sorted(start for start, _ in intervals)
+        self.ends = sorted(end for _, end in intervals)
+
+    def in_progress(self, minute):
+        return bisect_right(self.starts, minute) - bisect_right(self.ends, minute)
+
+    def peak_overlap(self, start, end):
+        """Most bookings in progress at any moment of ``[start, end)``."""
+        peak = self.in_progress(start)
+        for index in range(bisect_right(self.starts, start), len(self.starts)):
+            if self.starts[index] >= end:
+                break
+            peak = max(peak, self.in_progress(self.starts[index]))
+        return peak
+
+
+def load_day_schedule(amenity_id, booking_date, exclude_booking_id=None):
+    query = db.session.query(Booking.start_time, Booking.end_time).filter(
+        Booking.amenity_id == amenity_id,
+        Booking.booking_date == booking_date,
+        Booking.status.in_(ACTIVE_BOOKING_STATUSES)
+    )
+    if exclude_booking_id is not None:
+        query = query.filter(Booking.id != exclude_booking_id)
+
+    return DaySchedule((to_minutes(start), to_minutes(end)) for start, end in query)
+
+
+def check_slot(amenity_id, booking_date, start_time, end_time, exclude_booking_id=None):
+    """Check that a booking fits the amenity's capacity on that day.
+
+    Locks the amenity row for the rest of the transaction, so concurrent
+    requests for the same amenity, from any worker, are checked one after
+    another against committed bookings. Raises ``SlotUnavailable`` if the
+    booking does not fit; the caller must commit or roll back to release the
+    lock.
+    """
+    if end_time <= start_time:
+        raise SlotUnavailable('End time must be after start time', 400)
+
+    amenity = db.session.get(Amenity, amenity_id, with_for_update=True)
+    if amenity is None:
+        raise SlotUnavailable('Amenity not found', 404)
+    if not amenity.available:
+        raise SlotUnavailable('Amenity is not available for booking')
+    if amenity.capacity is None:
+        return
+
+    schedule = load_day_schedule(amenity_id, booking_date, exclude_booking_id)
+    if schedule.peak_overlap(to_minutes(start_time), to_minutes(end_time)) >= amenity.capacity:
+        raise SlotUnavailable('Amenity is fully booked for the requested time')
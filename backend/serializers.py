@@ -0,0 +1,165 @@
+from flask import request
+from sqlalchemy.orm import aliased, joinedload
+from models import User, Tower, Unit, Amenity, Booking, Lease, Payment
+from pagination import page_args, keyset_page
+from arrears import lease_balances
+
+
+# Relationships each model's to_dict() reads. Every entry is a many-to-one, so
+# joined loading pulls them into the same SELECT as the parent rows and a list
+# endpoint costs one query no matter how many rows it returns.
+LOAD_PLANS = {
+    Unit: (
+        joinedload(Unit.tower),
+    ),
+    Booking: (
+        joinedload(Booking.user),
+        joinedload(Booking.amenity),
+    ),
+    Lease: (
+        joinedload(Lease.unit).joinedload(Unit.tower),
+        joinedload(Lease.tenant),
+    ),
+}
+
+
+# Values a model's to_dict() would otherwise compute one row at a time,
+# computed for a whole batch of rows: model -> fn(rows) -> {id: to_dict kwargs}.
+BATCH_EXTRAS = {
+    Lease: lambda rows: {
+        lease_id: {'balance': balance} for lease_id, balance in lease_balances([row.id for row in rows]).items()
+    },
+}
+
+
+# Values of BATCH_EXTRAS that ?fields= can ask for alongside columns.
+COMPUTED_FIELDS = {
+    Lease: ('balance',),
+}
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+_tower, _unit, _user, _amenity = aliased(Tower), aliased(Unit), aliased(User), aliased(Amenity)
+
+
+def _columns(model, *names):
+    return {name: (getattr(model, name),) for name in names}
+
+
+# The to_dict() fields ?fields= can select, as field -> (column, *outer joins
+# the column needs). A sparse request compiles to a SELECT of only these
+# columns and serializes the result rows without building model instances.
+FIELD_COLUMNS = {
+    User: _columns(User, 'id', 'email', 'full_name', 'phone', 'role', 'created_at'),
+    Unit: {
+        **_columns(Unit, 'id', 'tower_id', 'unit_number', 'floor', 'bedrooms', 'bathrooms', 'area_sqft',
+                   'rent_amount', 'status', 'description', 'image_url', 'created_at'),
+        'tower_name': (_tower.name, (_tower, Unit.tower_id == _tower.id)),
+    },
+    Booking: {
+        **_columns(Booking, 'id', 'user_id', 'amenity_id', 'booking_date', 'start_time', 'end_time', 'status',
+                   'notes', 'admin_notes', 'created_at', 'updated_at'),
+        'user_name': (_user.full_name, (_user, Booking.user_id == _user.id)),
+        'user_email': (_user.email, (_user, Booking.user_id == _user.id)),
+        'amenity_name': (_amenity.name, (_amenity, Booking.amenity_id == _amenity.id)),
+    },
+    Lease: {
+        **_columns(Lease, 'id', 'unit_id', 'tenant_id', 'start_date', 'end_date', 'rent_amount',
+                   'security_deposit', 'status', 'terminated_on', 'created_at'),
+        'unit_number': (_unit.unit_number, (_unit, Lease.unit_id == _unit.id)),
+        'tower_name': (_tower.name, (_unit, Lease.unit_id == _unit.id), (_tower, _unit.tower_id == _tower.id)),
+        'tenant_name': (_user.full_name, (_user, Lease.tenant_id == _user.id)),
+        'tenant_email': (_user.email, (_user, Lease.tenant_id == _user.id)),
+    },
+    Payment: _columns(Payment, 'id', 'lease_id', 'amount', 'payment_date', 'payment_method', 'status',
+                      'transaction_id', 'notes', 'created_at'),
+}
+
+
+def eager(query, model):
+    """Attach the load plan for ``model`` to ``query``."""
+    return query.options(*LOAD_PLANS.get(model, ()))
+
+
+def to_dicts(rows, model):
+    """Serialize ``rows`` of ``model``, computing any ``BATCH_EXTRAS`` once for all of them."""
+    extras = BATCH_EXTRAS[model](rows) if model in BATCH_EXTRAS and rows else {}
+    return [obj.to_dict(**extras.get(obj.id, {})) for obj in rows]
+
+
+def field_args(model):
+    """Read ``fields`` from the query string.
+
+    Returns ``None`` when the client did not ask for a sparse fieldset,
+    otherwise the requested field names in order.
+    """
+    fields = request.args.get('fields')
+    if fields is None:
+        return None
+
+    allowed = [*FIELD_COLUMNS.get(model, {}), *COMPUTED_FIELDS.get(model, ())]
+    names = list(dict.fromkeys(name for name in fields.split(',') if name))
+    if not names or not set(names) <= set(allowed):
+        raise InvalidFields(f'fields must be a list of: {", ".join(allowed)}')
+    return names
+
+
+def project(query, model, fields):
+    """Narrow ``query`` to a column-only SELECT of ``fields``.
+
+    ``id`` and ``created_at`` are always selected so keyset pages and batch
+    extras still work; joins are added once each, as outer joins, so rows
+    without a related row keep a ``None`` like to_dict() gives.
+    """
+    columns = FIELD_COLUMNS[model]
+    selected = dict.fromkeys(['id', 'created_at', *(name for name in fields if name in columns)])
+    query = query.with_entities(*(columns[name][0].label(name) for name in selected))
+
+    joins = {}
+    for name in selected:
+        for target, onclause in columns[name][1:]:
+            joins.setdefault(target, onclause)
+    for target, onclause in joins.items():
+        query = query.outerjoin(target, onclause)
+    return query
+
+
+def sparse_dicts(rows, model, fields):
+    """Serialize projected ``rows`` to dicts holding only ``fields``.
+
+    Dates and times are left as objects for the response encoder to write.
+    """
+    computed = [name for name in fields if name in COMPUTED_FIELDS.get(model, ())]
+    extras = BATCH_EXTRAS[model](rows) if computed and rows else {}
+    return [
+        {name: extras.get(row.id, {}).get(name) if name in computed else getattr(row, name)
+         for name in fields}
+        for row in rows
+    ]
+
+
+def serialize_collection(query, model):
+    """Serialize a collection endpoint, one keyset page at a time if asked.
+
+    Without ``limit``/``cursor`` in the query string the full list is returned
+    as before; with them the body is ``{'items': [...], 'next_cursor': ...}``.
+    ``fields`` narrows each item to the named fields, read straight from
+    columns.
+    """
+    fields = field_args(model)
+    if fields is None:
+        query = eager(query, model)
+    else:
+        query = project(query, model, fields)
+
+    page = page_args()
+    if page is None:
+        rows, next_cursor = query.all(), None
+    else:
+        rows, next_cursor = keyset_page(query, model, *page)
+
+    items = to_dicts(rows, model) if fields is None else sparse_dicts(rows, model, fields)
+    return items if page is None else {'items': items, 'next_cursor': next_cursor}
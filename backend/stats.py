@@ -0,0 +1,101 @@
+import threading
+import time
+from flask import current_app
+from models import db, Unit, Lease, Booking, RevenueRollup
+from changes import on_commit
+from arrears import Arrears
+from logging_setup import logger
+
+STATS_TABLES = {'units', 'leases', 'bookings', 'payments'}
+
+
+def compute_dashboard_stats():
+    """Compute every dashboard figure in one SELECT of scalar subqueries."""
+    count = db.func.count
+    total_units, occupied_units, available_units, total_tenants, pending_bookings, total_revenue = db.session.query(
+        db.session.query(count(Unit.id)).scalar_subquery(),
+        db.session.query(count(Unit.id)).filter(Unit.status == 'occupied').scalar_subquery(),
+        db.session.query(count(Unit.id)).filter(Unit.status == 'available').scalar_subquery(),
+        db.session.query(count(Lease.id)).filter(Lease.status == 'active').scalar_subquery(),
+        db.session.query(count(Booking.id)).filter(Booking.status == 'pending').scalar_subquery(),
+        db.session.query(db.func.sum(RevenueRollup.amount))
+            .filter(RevenueRollup.period == 'month', RevenueRollup.status == 'completed').scalar_subquery()
+    ).one()
+
+    return {
+        'total_units': total_units,
+        'occupied_units': occupied_units,
+        'available_units': available_units,
+        'occupancy_rate': round((occupied_units / total_units * 100) if total_units > 0 else 0, 2),
+        'total_tenants': total_tenants,
+        'pending_bookings': pending_bookings,
+        'total_revenue': total_revenue or 0,
+        **Arrears().summary()
+    }
+
+
+class StatsSnapshot:
+    """Last computed dashboard stats, refreshed in the background when stale.
+
+    Commits in this process that touch the underlying tables mark the
+    snapshot stale straight away; writes from other workers are picked up
+    once it is older than ``DASHBOARD_STATS_MAX_AGE`` seconds. A stale
+    snapshot is still served while one background thread recomputes it, so
+    only the very first request of a worker waits for the computation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = None
+        self._taken_at = 0.0
+        self._generation = 0
+        self._stats_generation = -1
+        self._refreshing = False
+
+    def invalidate(self):
+        self._generation += 1
+
+    def _store(self, stats, generation, taken_at):
+        with self._lock:
+            if generation >= self._stats_generation:
+                self._stats, self._stats_generation, self._taken_at = stats, generation, taken_at
+
+    def _refresh(self, app, generation):
+        try:
+            with app.app_context():
+                taken_at = time.monotonic()
+                self._store(compute_dashboard_stats(), generation, taken_at)
+        except Exception:
+            logger.exception('dashboard stats refresh failed')
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def get(self):
+        max_age = current_app.config['DASHBOARD_STATS_MAX_AGE']
+        with self._lock:
+            generation = self._generation
+            first = self._stats is None
+            stale = self._stats_generation != generation or time.monotonic() - self._taken_at > max_age
+            refresh = stale and not first and not self._refreshing
+            if refresh:
+                self._refreshing = True
+        if first:
+            taken_at = time.monotonic()
+            self._store(compute_dashboard_stats(), generation, taken_at)
+        elif refresh:
+            threading.Thread(
+                target=self._refresh, args=(current_app._get_current_object(), generation), daemon=True
+            ).start()
+
+        with self._lock:
+            return dict(self._stats, generated_seconds_ago=round(time.monotonic() - self._taken_at, 1))
+
+
+dashboard_snapshot = StatsSnapshot()
+
+
+@on_commit
+def _invalidate_dashboard(tables):
+    if tables & STATS_TABLES:
+        dashboard_snapshot.invalidate()
@@ -0,0 +1,82 @@
+"""List endpoints issue the same number of queries however many rows they return."""
+import os
+import sys
+import tempfile
+from datetime import date, time, timedelta
+
+os.environ['DATABASE_URL'] = f'sqlite:///{os.path.join(tempfile.mkdtemp(), "query_counts.db")}'
+os.environ['PASSWORD_HASH_WORKERS'] = '0'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from sqlalchemy import event
+
+from app import bootstrap_database, create_app
+from models import db, User, Tower, Unit, Amenity, Booking, Lease
+
+
+@pytest.fixture(scope='module')
+def app():
+    app = create_app()
+    with app.app_context():
+        bootstrap_database()
+    return app
+
+
+@pytest.fixture(scope='module')
+def headers(app):
+    response = app.test_client().post('/api/auth/login', json={'email': 'admin@rental.com', 'password': 'admin123'})
+    return {'Authorization': f'Bearer {response.get_json()["access_token"]}'}
+
+
+def add_rows(app, count):
+    """Add ``count`` units, leases and bookings, each with its own tower and tenant."""
+    with app.app_context():
+        amenity = db.session.get(Amenity, 1)
+        for _ in range(count):
+            start = db.session.query(User).count()
+            tenant = User(email=f'tenant{start}@example.com', password_hash='-', full_name=f'Tenant {start}',
+                          role='resident')
+            tower = Tower(name=f'Tower {start}', address='-', total_floors=1)
+            unit = Unit(tower=tower, unit_number=f'T{start}', floor=1, bedrooms=1, bathrooms=1, area_sqft=500,
+                        rent_amount=1000, status='occupied')
+            db.session.add_all([
+                tenant, tower, unit,
+                Lease(unit=unit, tenant=tenant, start_date=date(2024, 1, 1), end_date=date(2024, 12, 31),
+                      rent_amount=1000, security_deposit=1000, status='active'),
+                Booking(user=tenant, amenity=amenity, booking_date=date.today() + timedelta(days=start),
+                        start_time=time(9), end_time=time(10), status='pending'),
+            ])
+        db.session.commit()
+
+
+def count_queries(app, client, path, headers, nonce):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        # A fresh query string keeps the response cache from answering.
+        response = client.get(f'{path}?nonce={nonce}', headers=headers)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    return len(response.get_json()), len(statements)
+
+
+@pytest.mark.parametrize('path', ['/api/bookings', '/api/leases', '/api/units'])
+def test_query_count_does_not_grow_with_rows(app, headers, path):
+    client = app.test_client()
+    client.get(path, headers=headers)  # warm the token state cache
+
+    few_rows, few_queries = count_queries(app, client, path, headers, 'few')
+    add_rows(app, 30)
+    many_rows, many_queries = count_queries(app, client, path, headers, 'many')
+
+    assert many_rows >= few_rows + 30
+    assert many_queries == few_queries
@@ -0,0 +1,145 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from sqlalchemy import text
+from models import db, Unit, Amenity
+from serializers import eager
+from pagination import offset_page_args
+from unit_search import InvalidSearch
+from versioning import read_versions
+
+# Searchable text per result type: (model, ((column, weight), ...)). On
+# Postgres migration 7 turns this into a generated ``search_vector`` column.
+SEARCH_FIELDS = {
+    'units': (Unit, (('unit_number', 'A'), ('description', 'B'))),
+    'amenities': (Amenity, (('name', 'A'), ('description', 'B'))),
+}
+
+# ts_rank's default weights for the labels used above.
+WEIGHTS = {'A': 1.0, 'B': 0.4}
+
+TOKEN = re.compile(r'\w+')
+
+# Postgres' english configuration drops these; the fallback index does too so
+# both backends agree on what a query must match.
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it',
+    'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'with',
+}
+
+
+def tokenize(value):
+    return [token for token in TOKEN.findall((value or '').lower()) if token not in STOP_WORDS]
+
+
+def _postgres_hits(terms, types, limit, offset):
+    query = ' & '.join(f'{term}:*' for term in terms)
+    union = ' UNION ALL '.join(
+        f"SELECT '{name}' AS type, id, ts_rank(search_vector, query) AS rank "
+        f"FROM {name}, to_tsquery('english', :query) query WHERE search_vector @@ query"
+        for name in types
+    )
+    rows = db.session.execute(text(
+        f'SELECT type, id, rank, count(*) OVER () AS total FROM ({union}) hits '
+        'ORDER BY rank DESC, type, id LIMIT :limit OFFSET :offset'
+    ), {'query': query, 'limit': limit, 'offset': offset}).all()
+
+    if rows:
+        total = rows[0].total
+    else:
+        total = db.session.execute(text(f'SELECT count(*) FROM ({union}) hits'), {'query': query}).scalar()
+    return [(row.type, row.id, row.rank) for row in rows], total
+
+
+class TextIndex:
+    """Pure-Python inverted index standing in for the tsvector columns off Postgres.
+
+    Postings map each token to ``{(type, id): weight}``; a sorted vocabulary
+    gives prefix matches with a bisect. The index is rebuilt whenever the
+    versions of the searched tables move.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = None
+        self._postings = {}
+        self._vocabulary = []
+
+    def _build(self):
+        postings = defaultdict(lambda: defaultdict(float))
+        for name, (model, fields) in SEARCH_FIELDS.items():
+            columns = [getattr(model, column) for column, _ in fields]
+            for ident, *values in db.session.query(model.id, *columns):
+                for value, (_, weight) in zip(values, fields):
+                    for token in tokenize(value):
+                        postings[token][(name, ident)] += WEIGHTS[weight]
+        self._postings = postings
+        self._vocabulary = sorted(postings)
+
+    def refresh(self):
+        versions, _ = read_versions(list(SEARCH_FIELDS))
+        with self._lock:
+            if versions != self._versions:
+                self._build()
+                self._versions = versions
+
+    def _prefix_postings(self, term):
+        position = bisect_left(self._vocabulary, term)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(term):
+            yield self._postings[self._vocabulary[position]]
+            position += 1
+
+    def hits(self, terms, types, limit, offset):
+        """Rank documents containing every term, matching each as a prefix."""
+        self.refresh()
+        scores = None
+        for term in terms:
+            term_scores = defaultdict(float)
+            for postings in self._prefix_postings(term):
+                for document, weight in postings.items():
+                    if document[0] in types:
+                        term_scores[document] += weight
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {document: score + term_scores[document]
+                          for document, score in scores.items() if document in term_scores}
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(name, ident, rank) for (name, ident), rank in ranked[offset:offset + limit]], len(ranked)
+
+
+text_index = TextIndex()
+
+
+def search(args):
+    """Run a full-text search over units and amenities for the query string ``args``."""
+    terms = tokenize(args.get('q'))
+    if not terms:
+        raise InvalidSearch('q must contain at least one search term')
+    types = args.get('type', ','.join(SEARCH_FIELDS)).split(',')
+    if not set(types) <= set(SEARCH_FIELDS):
+        raise InvalidSearch(f'type must be one of: {", ".join(SEARCH_FIELDS)}')
+    limit, offset = offset_page_args(args)
+
+    if db.engine.dialect.name == 'postgresql':
+        hits, total = _postgres_hits(terms, types, limit, offset)
+    else:
+        hits, total = text_index.hits(terms, types, limit, offset)
+
+    objects = {}
+    for name in {name for name, _, _ in hits}:
+        model = SEARCH_FIELDS[name][0]
+        ids = [ident for hit_name, ident, _ in hits if hit_name == name]
+        objects.update(((name, obj.id), obj) for obj in eager(model.query, model).filter(model.id.in_(ids)))
+
+    return {
+        'items': [
+            {'type': name, 'rank': round(rank, 4), 'item': objects[(name, ident)].to_dict()}
+            for name, ident, rank in hits if (name, ident) in objects
+        ],
+        'total': total,
+        'limit': limit,
+        'offset': offset
+    }
@@ -0,0 +1,281 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from models import db, Unit, UNIT_STATUSES
+from pagination import offset_page_args
+from serializers import eager
+from versioning import read_versions
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Query-string name -> Unit column, for range filters (min_*/max_* or an exact
+# value) and for ``sort`` (prefix with ``-`` for descending).
+RANGE_FILTERS = {
+    'bedrooms': 'bedrooms',
+    'bathrooms': 'bathrooms',
+    'floor': 'floor',
+    'area': 'area_sqft',
+    'rent': 'rent_amount',
+}
+SORT_FIELDS = dict(RANGE_FILTERS, created_at='created_at')
+DEFAULT_SORT = '-created_at'
+
+# Facet counts for each of these ignore the facet's own filter, so a client
+# can show how many units every alternative value would return.
+FACETS = ('status', 'tower_id', 'bedrooms', 'bathrooms')
+
+SEARCH_COLUMNS = ('id', 'tower_id', 'floor', 'bedrooms', 'bathrooms', 'area_sqft', 'rent_amount', 'status', 'created_at')
+
+# Rows stamped this long before the last refresh are fetched again, so a write
+# whose transaction committed after that refresh started is not missed.
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+
+class InvalidSearch(ValueError):
+    pass
+
+
+def _number(name, value, cast):
+    try:
+        return cast(value)
+    except ValueError:
+        raise InvalidSearch(f'{name} must be a number')
+
+
+def search_args(args):
+    """Parse the query string into ``(filters, sort, descending, limit, offset)``.
+
+    ``filters`` maps a Unit column to a set of allowed values (``status``,
+    ``tower_id``) or to an inclusive ``(low, high)`` range with either end
+    ``None``.
+    """
+    filters = {}
+    if args.get('status'):
+        filters['status'] = set(args['status'].split(','))
+    if args.get('tower_id'):
+        filters['tower_id'] = {_number('tower_id', value, int) for value in args['tower_id'].split(',')}
+
+    for name, column in RANGE_FILTERS.items():
+        cast = float if column in ('area_sqft', 'rent_amount') else int
+        if args.get(name):
+            low = high = _number(name, args[name], cast)
+        else:
+            low = _number(f'min_{name}', args[f'min_{name}'], cast) if args.get(f'min_{name}') else None
+            high = _number(f'max_{name}', args[f'max_{name}'], cast) if args.get(f'max_{name}') else None
+        if low is not None or high is not None:
+            filters[column] = (low, high)
+
+    sort = args.get('sort', DEFAULT_SORT)
+    descending = sort.startswith('-')
+    if sort.lstrip('-') not in SORT_FIELDS:
+        raise InvalidSearch(f'sort must be one of: {", ".join(SORT_FIELDS)}')
+    sort_column = SORT_FIELDS[sort.lstrip('-')]
+
+    limit, offset = offset_page_args(args)
+    return filters, sort_column, descending, limit, offset
+
+
+class UnitColumns:
+    """Searchable unit attributes as NumPy arrays, one row per unit, sorted by id.
+
+    Statuses are stored as codes into ``statuses``; -1 stands for a missing one.
+    Instances are never modified, so searches can use one without a lock.
+    """
+
+    def __init__(self, arrays, statuses):
+        self.arrays = arrays
+        self.statuses = statuses
+
+    @classmethod
+    def from_rows(cls, rows, statuses=UNIT_STATUSES):
+        statuses = list(statuses)
+        for row in rows:
+            if row.status is not None and row.status not in statuses:
+                statuses.append(row.status)
+        codes = {status: code for code, status in enumerate(statuses)}
+
+        arrays = {
+            'id': np.array([row.id for row in rows], dtype=np.int64),
+            'tower_id': np.array([row.tower_id for row in rows], dtype=np.int64),
+            'floor': np.array([row.floor for row in rows], dtype=np.int32),
+            'bedrooms': np.array([row.bedrooms for row in rows], dtype=np.int32),
+            'bathrooms': np.array([row.bathrooms for row in rows], dtype=np.int32),
+            'area_sqft': np.array([row.area_sqft for row in rows], dtype=np.float64),
+            'rent_amount': np.array([row.rent_amount for row in rows], dtype=np.float64),
+            'status': np.array([codes.get(row.status, -1) for row in rows], dtype=np.int8),
+            'created_at': np.array([row.created_at for row in rows], dtype='datetime64[us]'),
+        }
+        order = np.argsort(arrays['id'], kind='stable')
+        return cls({name: array[order] for name, array in arrays.items()}, tuple(statuses))
+
+    def __len__(self):
+        return len(self.arrays['id'])
+
+    def merged(self, rows):
+        """Return a copy with ``rows`` inserted or replacing the rows with the same id."""
+        patch = UnitColumns.from_rows(rows, self.statuses)
+        keep = ~np.isin(self.arrays['id'], patch.arrays['id'])
+        arrays = {name: np.concatenate([array[keep], patch.arrays[name]]) for name, array in self.arrays.items()}
+        order = np.argsort(arrays['id'], kind='stable')
+        return UnitColumns({name: array[order] for name, array in arrays.items()}, patch.statuses)
+
+    def mask(self, column, condition):
+        values = self.arrays[column]
+        if isinstance(condition, set):
+            if column == 'status':
+                condition = {self.statuses.index(status) for status in condition if status in self.statuses}
+            return np.isin(values, list(condition))
+
+        low, high = condition
+        matched = np.ones(len(values), dtype=bool)
+        if low is not None:
+            matched &= values >= low
+        if high is not None:
+            matched &= values <= high
+        return matched
+
+    def counts(self, column, matched):
+        values, counts = np.unique(self.arrays[column][matched], return_counts=True)
+        if column == 'status':
+            return {self.statuses[code]: int(count) for code, count in zip(values, counts) if code >= 0}
+        return {int(value): int(count) for value, count in zip(values, counts)}
+
+    def search(self, filters, sort_column, descending, limit, offset):
+        masks = {column: self.mask(column, condition) for column, condition in filters.items()}
+        matched = np.ones(len(self), dtype=bool)
+        for mask in masks.values():
+            matched &= mask
+
+        facets = {}
+        for facet in FACETS:
+            facet_matched = np.ones(len(self), dtype=bool)
+            for column, mask in masks.items():
+                if column != facet:
+                    facet_matched &= mask
+            facets[facet] = self.counts(facet, facet_matched)
+
+        rows = np.flatnonzero(matched)
+        # Ties fall back to id, matching the (column, id) order of the SQL path.
+        order = np.lexsort((self.arrays['id'][rows], self.arrays[sort_column][rows]))
+        if descending:
+            order = order[::-1]
+        page = rows[order[offset:offset + limit]]
+        return self.arrays['id'][page].tolist(), len(rows), facets
+
+
+class UnitIndex:
+    """In-memory columnar index over units, kept in step with the database.
+
+    Each search reads the ``units`` table version first (one primary-key
+    lookup). When it has moved, the rows updated since the last refresh are
+    patched in; a deletion, or an index older than
+    ``UNIT_SEARCH_REBUILD_SECONDS``, rebuilds it from scratch. Writes from
+    every worker are therefore visible to the next search.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._columns = None
+        self._version = None
+        self._refreshed_at = None
+        self._built_at = 0.0
+        self.rebuilds = 0
+        self.patches = 0
+
+    def _fetch(self, since=None):
+        query = db.session.query(*(getattr(Unit, name) for name in SEARCH_COLUMNS))
+        if since is not None:
+            query = query.filter(Unit.updated_at >= since)
+        return query.all()
+
+    def _rebuild(self, version):
+        started = datetime.utcnow()
+        self._columns = UnitColumns.from_rows(self._fetch())
+        self._version = version
+        self._refreshed_at = started
+        self._built_at = time.monotonic()
+        self.rebuilds += 1
+
+    def _patch(self, version):
+        started = datetime.utcnow()
+        columns = self._columns.merged(self._fetch(since=self._refreshed_at - REFRESH_OVERLAP))
+        if len(columns) != db.session.query(db.func.count(Unit.id)).scalar():
+            self._rebuild(version)
+            return
+        self._columns = columns
+        self._version = version
+        self._refreshed_at = started
+        self.patches += 1
+
+    def columns(self):
+        versions, _ = read_versions(['units'])
+        version = versions.get('units')
+        max_age = current_app.config['UNIT_SEARCH_REBUILD_SECONDS']
+        with self._lock:
+            if self._columns is None or time.monotonic() - self._built_at > max_age:
+                self._rebuild(version)
+            elif version != self._version:
+                self._patch(version)
+            return self._columns
+
+
+unit_index = UnitIndex()
+
+
+def _sql_conditions(filters, skip=None):
+    conditions = []
+    for column, condition in filters.items():
+        if column == skip:
+            continue
+        attribute = getattr(Unit, column)
+        if isinstance(condition, set):
+            conditions.append(attribute.in_(condition))
+            continue
+        low, high = condition
+        if low is not None:
+            conditions.append(attribute >= low)
+        if high is not None:
+            conditions.append(attribute <= high)
+    return conditions
+
+
+def sql_search(filters, sort_column, descending, limit, offset):
+    """The same search as ``UnitColumns.search``, served by the composite unit indexes."""
+    conditions = _sql_conditions(filters)
+    total = db.session.query(db.func.count(Unit.id)).filter(*conditions).scalar()
+
+    sort_key, tie_break = getattr(Unit, sort_column), Unit.id
+    if descending:
+        sort_key, tie_break = sort_key.desc(), tie_break.desc()
+    page = db.session.query(Unit.id).filter(*conditions).order_by(sort_key, tie_break).offset(offset).limit(limit)
+    ids = [ident for ident, in page]
+
+    facets = {}
+    for facet in FACETS:
+        attribute = getattr(Unit, facet)
+        rows = db.session.query(attribute, db.func.count(Unit.id)) \
+            .filter(*_sql_conditions(filters, skip=facet)).group_by(attribute)
+        facets[facet] = {value: count for value, count in rows if value is not None}
+    return ids, total, facets
+
+
+def search(args):
+    """Run a unit search for the query string ``args``."""
+    filters, sort_column, descending, limit, offset = search_args(args)
+    if np is not None and current_app.config['UNIT_SEARCH_INDEX']:
+        ids, total, facets = unit_index.columns().search(filters, sort_column, descending, limit, offset)
+    else:
+        ids, total, facets = sql_search(filters, sort_column, descending, limit, offset)
+
+    units = {unit.id: unit for unit in eager(Unit.query, Unit).filter(Unit.id.in_(ids))} if ids else {}
+    return {
+        'items': [units[ident].to_dict() for ident in ids if ident in units],
+        'total': total,
+        'limit': limit,
+        'offset': offset,
+        'facets': facets
+    }
@@ -0,0 +1,73 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+from flask import g, make_response, request
+from models import db, TableVersion
+from changes import on_change
+from encoders import negotiated_mimetype, vary_on_accept
+from compression import negotiated_encoding
+
+# Catalog tables whose public reads are served with validators. Every write
+# transaction touching one of them bumps its row once, so keep this to tables
+# that change rarely.
+VERSIONED_TABLES = ('towers', 'units', 'amenities')
+
+table_versions = TableVersion.__table__
+
+
+@on_change
+def _bump_versions(session, tables):
+    names = [name for name in VERSIONED_TABLES if name in tables]
+    if names:
+        session.connection().execute(
+            table_versions.update()
+            .where(table_versions.c.name.in_(names))
+            .values(version=table_versions.c.version + 1, updated_at=datetime.utcnow())
+        )
+
+
+def read_versions(tables):
+    """Return ``({table: version}, last_modified)`` with one primary-key lookup."""
+    rows = db.session.execute(
+        db.select(table_versions.c.name, table_versions.c.version, table_versions.c.updated_at)
+        .where(table_versions.c.name.in_(tables))
+    ).all()
+    versions = {name: version for name, version, _ in rows}
+    last_modified = max((updated_at for _, _, updated_at in rows), default=None)
+    return versions, last_modified
+
+
+def conditional(*tables):
+    """Serve a read route with ETag/Last-Modified derived from table versions.
+
+    The validators depend only on the request URL and the versions of
+    ``tables``, so a matching ``If-None-Match`` is answered with 304 before
+    the view runs. ``If-Modified-Since`` is not honoured: Last-Modified has
+    one-second resolution, so a write in the same second as the client's
+    copy would be answered with a 304 for stale content.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            versions, last_modified = read_versions(tables)
+            g.table_versions = versions
+            stamp = ','.join(f'{name}:{versions.get(name, 0)}' for name in tables)
+            # Each format and content coding is its own representation with its own ETag.
+            representation = f'{negotiated_mimetype()}|{negotiated_encoding()}'
+            etag = hashlib.sha1(f'{request.full_path}|{representation}|{stamp}'.encode()).hexdigest()
+            if last_modified is not None:
+                last_modified = last_modified.replace(microsecond=0)
+
+            if request.if_none_match.contains(etag):
+                response = vary_on_accept(make_response('', 304))
+            else:
+                response = make_response(fn(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator